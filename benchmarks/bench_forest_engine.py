@@ -0,0 +1,86 @@
+"""
+Compare the flat-array forest engine against the stock sklearn pipeline.
+
+    python -m benchmarks.bench_forest_engine [--model PATH] [--batch 1000]
+
+Checks that probabilities match and reports single-row and batch latency.
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+
+from src.dataset import load_dataset
+from src.forest_engine import CompiledModel
+from src.train_model import FLAT_MODEL_PATH, MODEL_PATH
+
+
+def time_call(fn, repeat):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(model_path=MODEL_PATH, flat_path=FLAT_MODEL_PATH, batch=1000, repeat=50):
+    model = joblib.load(model_path)
+    if os.path.exists(flat_path) and os.path.getmtime(flat_path) >= os.path.getmtime(model_path):
+        compiled = CompiledModel.load(flat_path)
+    else:
+        compiled = CompiledModel.from_pipeline(model)
+
+    df = load_dataset().drop(columns="Disease").head(batch)
+    indices = [compiled.symptom_indices(s.split(",")) for s in df["Symptoms"]]
+    ages = df["Age"].to_numpy()
+    genders = df["Gender"].tolist()
+    counts = df["Symptom_Count"].to_numpy()
+
+    expected = model.predict_proba(df)
+    got = compiled.predict_proba_indices(ages, genders, indices, counts)
+    max_diff = float(np.abs(expected - got).max())
+
+    row = df.head(1)
+    single_pipeline = time_call(lambda: model.predict_proba(row), repeat)
+    single_flat = time_call(
+        lambda: compiled.predict_proba_indices(ages[:1], genders[:1], indices[:1], counts[:1]),
+        repeat,
+    )
+    batch_pipeline = time_call(lambda: model.predict_proba(df), max(1, repeat // 10))
+    batch_flat = time_call(
+        lambda: compiled.predict_proba_indices(ages, genders, indices, counts),
+        max(1, repeat // 10),
+    )
+
+    results = {
+        "trees": compiled.forest.n_trees,
+        "nodes": compiled.forest.n_nodes,
+        "max_abs_diff": max_diff,
+        "single_row_ms": {"pipeline": single_pipeline * 1e3, "flat": single_flat * 1e3},
+        "batch_size": len(df),
+        "batch_ms": {"pipeline": batch_pipeline * 1e3, "flat": batch_flat * 1e3},
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--flat", default=FLAT_MODEL_PATH)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    r = run(args.model, args.flat, args.batch, args.repeat)
+    print(f"Forest: {r['trees']} trees, {r['nodes']} nodes")
+    print(f"Max |proba difference| vs sklearn: {r['max_abs_diff']:.2e}")
+    for key, label in (("single_row_ms", "Single row"), ("batch_ms", f"Batch of {r['batch_size']}")):
+        t = r[key]
+        print(f"{label:>16}: pipeline {t['pipeline']:.3f} ms | flat {t['flat']:.3f} ms "
+              f"({t['pipeline'] / t['flat']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Compare the hashed symptom features with the fitted vocabulary.
+
+    python -m benchmarks.bench_hashing [--rows N] [--typo-rate 0.05]
+                                       [--widths 256,1024,4096]
+
+Runs on data/Healthcare.csv (all rows unless --rows is given) with a
+fraction of symptom tokens misspelled, as free text would be, so the
+vocabulary keeps growing with the data. For each feature mode it
+reports the matrix width and memory, fit and transform time, the share
+of test tokens the mode can't represent, and the holdout accuracy of a
+random forest. Even the vocabulary model scores close to chance on this
+dataset (see reports/metrics.txt), so read accuracy differences of a
+point or two between modes as noise.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from src.dataset import load_dataset
+from src.preprocessing import FullFeatureTransformer, HashingFeatureTransformer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "hashing.json")
+FEATURE_COLUMNS = ["Age", "Gender", "Symptoms", "Symptom_Count"]
+N_ESTIMATORS = 50
+
+
+def misspell(frame, rate, seed=0):
+    """Copy of frame with each symptom token misspelled with probability rate."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+
+    def typo(token):
+        i = rng.integers(len(token))
+        kind = rng.integers(3)
+        if kind == 0:  # drop a letter
+            return token[:i] + token[i + 1:]
+        if kind == 1:  # double a letter
+            return token[:i] + token[i] + token[i:]
+        return token[:i] + rng.choice(letters) + token[i + 1:]
+
+    def spoil(text):
+        tokens = [t.strip() for t in text.split(",")]
+        return ", ".join(typo(t) if len(t) > 2 and rng.random() < rate else t for t in tokens)
+
+    out = frame.copy()
+    out["Symptoms"] = [spoil(t) for t in frame["Symptoms"]]
+    return out
+
+
+def matrix_mb(X):
+    if sp.issparse(X):
+        nbytes = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    else:
+        nbytes = X.nbytes
+    return nbytes / 2**20
+
+
+def modes(widths):
+    out = [
+        ("vocabulary, dense", lambda: FullFeatureTransformer()),
+        ("vocabulary, sparse", lambda: FullFeatureTransformer(sparse=True)),
+    ]
+    for w in widths:
+        out.append((f"hashing {w}", lambda w=w: HashingFeatureTransformer(w)))
+    for w in widths[-1:]:
+        out.append((f"hashing {w} + bigrams",
+                    lambda w=w: HashingFeatureTransformer(w, bigrams=True)))
+    return out
+
+
+def unrepresented_share(features, X_test):
+    """Share of test symptom tokens that map to no column."""
+    tokens = X_test["Symptoms"].fillna("").str.split(",").explode().str.strip().str.lower()
+    tokens = tokens[tokens != ""]
+    if isinstance(features, HashingFeatureTransformer):
+        return 0.0
+    return float((~tokens.isin(features.symptom_index_)).mean())
+
+
+def run(rows, typo_rate, widths, seed=0):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
+    df = load_dataset()
+    if rows and rows < len(df):
+        df = df.sample(rows, random_state=seed)
+    df = misspell(df.reset_index(drop=True), typo_rate, seed)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[FEATURE_COLUMNS], df["Disease"], test_size=0.2, stratify=df["Disease"], random_state=42
+    )
+
+    results = []
+    for name, make in modes(widths):
+        features = make()
+        start = time.perf_counter()
+        Xt_train = features.fit_transform(X_train)
+        fit_transform_s = time.perf_counter() - start
+        start = time.perf_counter()
+        Xt_test = features.transform(X_test)
+        transform_s = time.perf_counter() - start
+
+        clf = RandomForestClassifier(n_estimators=N_ESTIMATORS, random_state=42, n_jobs=-1)
+        start = time.perf_counter()
+        clf.fit(Xt_train, y_train)
+        model_fit_s = time.perf_counter() - start
+        accuracy = float((clf.predict(Xt_test) == y_test.to_numpy()).mean())
+
+        r = {
+            "mode": name,
+            "width": Xt_train.shape[1],
+            "train_matrix_mb": matrix_mb(Xt_train),
+            "fit_transform_s": fit_transform_s,
+            "transform_s": transform_s,
+            "transform_rows_per_sec": len(X_test) / transform_s if transform_s > 0 else None,
+            "unrepresented_test_tokens": unrepresented_share(features, X_test),
+            "model_fit_s": model_fit_s,
+            "accuracy": accuracy,
+        }
+        results.append(r)
+        print(f"{name:>22}  width {r['width']:6d}  {r['train_matrix_mb']:8.2f} MB  "
+              f"fit+transform {fit_transform_s:6.3f}s  transform {transform_s:6.3f}s  "
+              f"unseen {r['unrepresented_test_tokens']:6.2%}  acc {accuracy:.4f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=None,
+                        help="sample this many rows of the dataset (default: all)")
+    parser.add_argument("--typo-rate", type=float, default=0.05,
+                        help="share of symptom tokens misspelled (default: 0.05)")
+    parser.add_argument("--widths", default="256,1024,4096", help="hashed widths to try")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the JSON results")
+    args = parser.parse_args()
+
+    widths = [int(w) for w in args.widths.split(",") if w.strip()]
+    results = run(args.rows, args.typo_rate, widths, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"rows": args.rows, "typo_rate": args.typo_rate, "results": results}, f, indent=2)
+    print(f"\nResults written to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
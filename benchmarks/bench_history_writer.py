@@ -0,0 +1,105 @@
+"""
+Compare history write throughput: the old per-row CSV append, per-row
+SQLite inserts, and the background batched HistoryWriter.
+
+    python -m benchmarks.bench_history_writer [--records 5000]
+
+Everything is written to a temporary directory.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from src.history import HistoryWriter
+from src.history_store import HISTORY_COLUMNS, HistoryStore
+
+
+def make_records(n):
+    return [
+        {
+            "timestamp": datetime.now(),
+            "age": 20 + i % 60,
+            "gender": ("Male", "Female", "Other")[i % 3],
+            "symptoms": "fever, cough, fatigue",
+            "symptom_count": 3,
+            "predicted_disease": "Influenza",
+            "top1_prob": 0.4,
+            "top2_disease": "Common Cold",
+            "top2_prob": 0.3,
+            "top3_disease": "COVID-19",
+            "top3_prob": 0.1,
+        }
+        for i in range(n)
+    ]
+
+
+def csv_per_row(records, path):
+    # What append_prediction used to do: open, append one row, close
+    for rec in records:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_exists = os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=HISTORY_COLUMNS)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(rec)
+
+
+def sqlite_per_row(records, path):
+    store = HistoryStore(path)
+    for rec in records:
+        store.append(rec)
+    store.close()
+
+
+def background_writer(records, path):
+    store = HistoryStore(path)
+    writer = HistoryWriter(store)
+    start = time.perf_counter()
+    for rec in records:
+        writer.append(rec)
+    enqueue = time.perf_counter() - start
+    writer.close()
+    store.close()
+    return enqueue
+
+
+def run(n_records=5000):
+    records = make_records(n_records)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        csv_per_row(records, os.path.join(tmp, "history.csv"))
+        results["csv_per_row"] = n_records / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        sqlite_per_row(records, os.path.join(tmp, "per_row.db"))
+        results["sqlite_per_row"] = n_records / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        enqueue = background_writer(records, os.path.join(tmp, "writer.db"))
+        results["writer_end_to_end"] = n_records / (time.perf_counter() - start)
+        results["writer_enqueue"] = n_records / enqueue
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=5000)
+    args = parser.parse_args()
+
+    labels = {
+        "csv_per_row": "CSV, open/append/close per row",
+        "sqlite_per_row": "SQLite, one insert per row",
+        "writer_end_to_end": "HistoryWriter, incl. final flush",
+        "writer_enqueue": "HistoryWriter, caller-side cost",
+    }
+    for key, rate in run(args.records).items():
+        print(f"{labels[key]:>34}: {rate:>12,.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
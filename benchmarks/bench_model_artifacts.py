@@ -0,0 +1,195 @@
+"""
+Compare model artifact variants: size, load time, memory and accuracy.
+
+    python -m benchmarks.bench_model_artifacts [--model PATH]
+                                               [--depths 12,20] [--min-leaf 3,10]
+                                               [--output results.json]
+
+Exports the trained forest as flat arrays in several variants (exact,
+compact float32/float16 leaves, pruned by depth or leaf size) and scores
+the training holdout with each, next to the joblib pickle. Every variant
+is loaded in a fresh process. Memory is reported as RSS and anonymous
+(private heap) memory: memory-mapped arrays are file-backed, so their
+pages count towards RSS once touched but are shared through the page
+cache by every process that maps the same files.
+
+Load times are with a warm page cache, since each file was just written.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "model_artifacts.json")
+
+
+def _memory_mb():
+    """(RSS, anonymous) in MB from /proc/self/smaps_rollup; Nones elsewhere."""
+    values = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return None, None
+    return values.get("Rss"), values.get("Anonymous")
+
+
+def _holdout():
+    # The split train_model evaluates on
+    from sklearn.model_selection import train_test_split
+
+    from src.train_model import FEATURE_COLUMNS, load_data
+
+    df = load_data()
+    _, X_test, _, y_test = train_test_split(
+        df[FEATURE_COLUMNS], df["Disease"], test_size=0.2, stratify=df["Disease"], random_state=42
+    )
+    return X_test, y_test.to_numpy()
+
+
+def _measure(path, mmap_mode):
+    from src.forest_engine import load_model
+
+    rss_start, anon_start = _memory_mb()
+    start = time.perf_counter()
+    model = load_model(path, mmap_mode)
+    load_s = time.perf_counter() - start
+    rss_loaded, anon_loaded = _memory_mb()
+
+    X_test, y_test = _holdout()
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    predict_s = time.perf_counter() - start
+    rss_scored, anon_scored = _memory_mb()
+
+    def delta(after, before):
+        return None if after is None else after - before
+
+    classes = np.asarray(model.classes_)
+    return {
+        "load_s": load_s,
+        "predict_s": predict_s,
+        "rss_after_load_mb": delta(rss_loaded, rss_start),
+        "anon_after_load_mb": delta(anon_loaded, anon_start),
+        "rss_after_predict_mb": delta(rss_scored, rss_start),
+        "anon_after_predict_mb": delta(anon_scored, anon_start),
+        "accuracy": float((classes[proba.argmax(axis=1)] == y_test).mean()),
+        "proba": proba,
+    }
+
+
+def _size_mb(path):
+    if os.path.isdir(path):
+        total = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    else:
+        total = os.path.getsize(path)
+    return total / 2**20
+
+
+def variants(depths, min_leaf):
+    """(name, export options, mmap_mode) for every flat variant."""
+    out = [
+        ("flat", {}, "r"),
+        ("flat (read into memory)", {}, None),
+        ("compact f32", {"compact": True}, "r"),
+        ("compact f16", {"compact": True, "value_dtype": "float16"}, "r"),
+    ]
+    out += [(f"compact f32, depth {d}", {"compact": True, "max_depth": d}, "r") for d in depths]
+    out += [
+        (f"compact f32, leaf >= {n}", {"compact": True, "min_samples_leaf": n}, "r")
+        for n in min_leaf
+    ]
+    return out
+
+
+def run(model_path, depths, min_leaf, workdir):
+    import joblib
+
+    from src.train_model import export_flat_model
+
+    specs = [("joblib pickle", model_path, None, {})]
+    model = joblib.load(model_path)
+    exported = {}
+    for name, options, mmap_mode in variants(depths, min_leaf):
+        key = json.dumps(options, sort_keys=True)
+        if key not in exported:
+            path = os.path.join(workdir, f"variant{len(exported)}")
+            start = time.perf_counter()
+            compiled = export_flat_model(model, path, **options)
+            exported[key] = (path, time.perf_counter() - start, compiled.forest)
+        path, export_s, forest = exported[key]
+        specs.append((name, path, mmap_mode, {
+            "export_s": export_s,
+            "nodes": forest.n_nodes,
+            "max_depth": forest.max_depth,
+            "options": options,
+        }))
+    # Free the forest before measuring so children get the memory
+    del model, exported
+
+    results = []
+    reference = None
+    context = multiprocessing.get_context("spawn")
+    for name, path, mmap_mode, extra in specs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            r = pool.submit(_measure, path, mmap_mode).result()
+        proba = r.pop("proba")
+        if reference is None:
+            reference = proba
+        r["max_abs_proba_diff"] = float(np.abs(proba - reference).max())
+        r["agreement"] = float((proba.argmax(axis=1) == reference.argmax(axis=1)).mean())
+        r.update(name=name, size_mb=_size_mb(path), **extra)
+        results.append(r)
+        print(_format_row(r))
+    return results
+
+
+def _mb(value):
+    return "     n/a" if value is None else f"{value:8.1f}"
+
+
+def _format_row(r):
+    return (f"{r['name']:>26}  {r['size_mb']:9.1f} MB  load {r['load_s'] * 1e3:9.1f} ms  "
+            f"rss {_mb(r['rss_after_predict_mb'])}  anon {_mb(r['anon_after_predict_mb'])} MB  "
+            f"acc {r['accuracy']:.4f}  agree {r['agreement']:.4f}  "
+            f"max diff {r['max_abs_proba_diff']:.1e}")
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main():
+    from src.train_model import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--depths", default="12,20", help="pruning depths to try")
+    parser.add_argument("--min-leaf", default="3,10", help="minimum leaf sizes to try")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the JSON report")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="artifacts-", dir=os.path.dirname(os.path.abspath(args.model)))
+    try:
+        results = run(args.model, _int_list(args.depths), _int_list(args.min_leaf), workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"model": args.model, "results": results}, f, indent=2)
+    print(f"\nReport written to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
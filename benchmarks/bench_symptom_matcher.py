@@ -0,0 +1,154 @@
+"""
+Latency and accuracy of fuzzy symptom matching against vocabulary size.
+
+    python -m benchmarks.bench_symptom_matcher [--sizes 0,10000,50000]
+                                               [--queries 2000]
+
+Size 0 is the real vocabulary from data/Healthcare.csv with the alias
+table; larger sizes pad it with synthetic multi-word terms, so the index
+has that many entries to search. Queries are vocabulary terms and aliases
+with one typo each (the same typos as bench_hashing) plus a share of
+unrelated words that should match nothing. Matching is timed per token
+with the memo cache disabled, i.e. every lookup searches the index.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_hashing import misspell
+from src.symptom_matcher import SymptomMatcher, load_aliases, normalize_token
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "symptom_matcher.json")
+DATA_PATH = os.path.join(os.path.dirname(BENCH_DIR), "data", "Healthcare.csv")
+SYLLABLES = ["ab", "ca", "de", "fi", "go", "hu", "ja", "ke", "li", "mo", "nu", "pa",
+             "qui", "ro", "se", "ti", "vo", "wu", "xe", "yo", "za", "tra", "ple", "dro"]
+# Words the synthetic terms are composed of, as in large clinical
+# vocabularies ("intermittent left lower back pain")
+MODIFIERS = ["acute", "chronic", "mild", "severe", "intermittent", "recurrent", "persistent",
+             "sudden", "progressive", "nocturnal", "exertional", "postprandial", "bilateral",
+             "left", "right", "upper", "lower", "generalized", "localized", "radiating"]
+SITES = ["abdominal", "back", "chest", "neck", "shoulder", "knee", "hip", "ankle", "wrist",
+         "elbow", "jaw", "ear", "eye", "throat", "scalp", "groin", "pelvic", "flank", "calf",
+         "thigh", "forearm", "finger", "toe", "heel", "rib", "spine", "skin", "tongue", "lip", "gum"]
+FINDINGS = ["pain", "swelling", "stiffness", "numbness", "tingling", "weakness", "cramping",
+            "itching", "burning", "tenderness", "bruising", "redness", "rash", "discharge",
+            "bleeding", "spasm", "ache", "pressure", "discomfort", "lesion", "lump", "ulcer",
+            "blistering", "dryness", "scaling", "tremor", "twitching", "sensitivity"]
+# Share of queries that are noise words rather than typos of known terms
+NOISE_RATE = 0.2
+
+
+def real_vocabulary():
+    tokens = pd.read_csv(DATA_PATH, usecols=["Symptoms"])["Symptoms"].fillna("")
+    tokens = tokens.str.split(",").explode().str.strip().str.lower()
+    return sorted(set(tokens[tokens != ""]))
+
+
+def pseudo_words(n, rng, min_syllables=2, max_syllables=4):
+    counts = rng.integers(min_syllables, max_syllables + 1, size=n)
+    picks = rng.integers(len(SYLLABLES), size=int(counts.sum()))
+    words, start = [], 0
+    for c in counts:
+        words.append("".join(SYLLABLES[i] for i in picks[start:start + c]))
+        start += c
+    return words
+
+
+def padded_vocabulary(vocab, size, rng):
+    """vocab plus synthetic "[modifier] [modifier] site finding" terms up to size entries."""
+    terms = set(vocab)
+    words = [[""] + MODIFIERS, [""] + MODIFIERS, SITES, FINDINGS]
+    while len(terms) < size:
+        n = size - len(terms)
+        parts = [np.array(w, dtype=object)[rng.integers(len(w), size=n)] for w in words]
+        terms.update(" ".join(p for p in row if p) for row in zip(*parts))
+    return sorted(terms)
+
+
+def make_queries(vocab, aliases, n, rng):
+    """[(query, expected vocabulary term or None)]."""
+    sources = [(t, t) for t in vocab] + [(a, t) for a, t in aliases.items() if t in set(vocab)]
+    picks = rng.integers(len(sources), size=n)
+    spoiled = misspell(pd.DataFrame({"Symptoms": [sources[i][0] for i in picks]}), 1.0,
+                       int(rng.integers(1 << 31)))["Symptoms"]
+    queries = list(zip(spoiled, (sources[i][1] for i in picks)))
+    noise = pseudo_words(int(n * NOISE_RATE), rng, 3, 5)
+    return queries + [(w, None) for w in noise]
+
+
+def run(sizes, n_queries, seed=0):
+    rng = np.random.default_rng(seed)
+    base = real_vocabulary()
+    aliases = load_aliases()
+    results = []
+    for size in sizes:
+        vocab = padded_vocabulary(base, size, rng) if size > len(base) else base
+        start = time.perf_counter()
+        matcher = SymptomMatcher(vocab, aliases, cache_size=0)
+        build_s = time.perf_counter() - start
+
+        # Typos of the padded terms too, so the queries cover the whole index
+        queries = make_queries(vocab, aliases, n_queries, rng)
+        latencies = np.empty(len(queries))
+        correct = wrong = missed = 0
+        for k, (query, expected) in enumerate(queries):
+            start = time.perf_counter()
+            got = matcher.match(query)
+            latencies[k] = time.perf_counter() - start
+            if got == expected:
+                correct += 1
+            elif got is None:
+                missed += 1
+            else:
+                wrong += 1
+
+        # A typo can land on another term exactly; those aren't the matcher's fault
+        exact_collisions = sum(
+            1 for q, e in queries if e is not None and normalize_token(q) in matcher._targets
+            and matcher._targets[normalize_token(q)] != e
+        )
+        r = {
+            "vocabulary": len(vocab),
+            "index_terms": len(matcher),
+            "build_s": build_s,
+            "queries": len(queries),
+            "p50_us": float(np.percentile(latencies, 50) * 1e6),
+            "p99_us": float(np.percentile(latencies, 99) * 1e6),
+            "max_us": float(latencies.max() * 1e6),
+            "correct": correct / len(queries),
+            "wrong": wrong / len(queries),
+            "missed": missed / len(queries),
+            "exact_collisions": exact_collisions / len(queries),
+        }
+        results.append(r)
+        print(f"{r['vocabulary']:>7} terms ({r['index_terms']:>7} indexed)  "
+              f"build {build_s:6.2f}s  p50 {r['p50_us']:7.1f} us  p99 {r['p99_us']:7.1f} us  "
+              f"max {r['max_us']:8.1f} us  correct {r['correct']:6.2%}  "
+              f"wrong {r['wrong']:6.2%}  missed {r['missed']:6.2%}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="0,10000,50000",
+                        help="vocabulary sizes (0: the real vocabulary only)")
+    parser.add_argument("--queries", type=int, default=2000, help="typo queries per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the JSON results")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run(sizes, args.queries, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"queries": args.queries, "results": results}, f, indent=2)
+    print(f"\nResults written to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
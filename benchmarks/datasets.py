@@ -0,0 +1,29 @@
+"""
+Synthetic inputs for the benchmark suite, drawn from src.synth with a
+fixed seed so every run measures the same data.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.synth import PatientModel
+
+
+@lru_cache(maxsize=1)
+def patient_model():
+    return PatientModel.from_csv()
+
+
+def synthetic_frame(n_rows, seed=0):
+    """n_rows synthetic patients in the Healthcare.csv layout."""
+    return pd.concat(patient_model().iter_chunks(n_rows, seed), ignore_index=True)
+
+
+def synthetic_history_records(n_records, seed=0, days=90):
+    """n_records prediction_history rows spread over the last `days` days."""
+    rng = np.random.default_rng(seed)
+    end = datetime.now()
+    frame = patient_model().sample_history(n_records, rng, end - timedelta(days=days), end)
+    return frame.to_dict("records")
@@ -0,0 +1,349 @@
+"""
+Benchmark suite for the transform, training, prediction and history paths.
+
+    python -m benchmarks.suite [--sizes 10k,100k,1m] [--cases a,b] [--full]
+                               [--output results.json]
+                               [--save-baseline] [--compare [PATH]]
+
+Each case runs in a fresh process on a synthetic dataset of each size, so
+its peak RSS is its own. Results are written as JSON; --compare flags any
+case that got slower than the baseline by more than --threshold and exits
+with status 1.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "latest.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "results", "baseline.json")
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+FEATURE_COLUMNS = ["Age", "Gender", "Symptoms", "Symptom_Count"]
+# Rows the prediction cases' model is trained on (not timed)
+PREDICT_TRAIN_ROWS = 2_000
+SINGLE_ROW_CALLS = 100
+# Stop repeating a case once one run takes this long
+REPEAT_BUDGET_S = 5.0
+
+
+def _transform_fit(df, tmp):
+    from src.preprocessing import FullFeatureTransformer
+
+    X = df[FEATURE_COLUMNS]
+    return lambda: FullFeatureTransformer().fit(X), len(df)
+
+
+def _transform(sparse):
+    def setup(df, tmp):
+        from src.preprocessing import FullFeatureTransformer
+
+        X = df[FEATURE_COLUMNS]
+        features = FullFeatureTransformer(sparse=sparse).fit(X)
+        return lambda: features.transform(X), len(df)
+    return setup
+
+
+def _transform_hashing(df, tmp):
+    from src.preprocessing import HashingFeatureTransformer
+
+    X = df[FEATURE_COLUMNS]
+    features = HashingFeatureTransformer()
+    return lambda: features.transform(X), len(df)
+
+
+def _transform_fuzzy(df, tmp):
+    # 5% of symptom tokens misspelled, mapped back by the symptom matcher
+    from benchmarks.bench_hashing import misspell
+    from src.preprocessing import FullFeatureTransformer
+
+    X = df[FEATURE_COLUMNS]
+    features = FullFeatureTransformer(sparse=True, fuzzy=True).fit(X)
+    X_typos = misspell(X, 0.05)
+    return lambda: features.transform(X_typos), len(df)
+
+
+def _pipeline_fit(df, tmp):
+    from src.train_model import build_pipeline
+
+    X, y = df[FEATURE_COLUMNS], df["Disease"]
+    return lambda: build_pipeline().fit(X, y), len(df)
+
+
+def _small_model(df):
+    from src.train_model import build_pipeline
+
+    train = df.head(PREDICT_TRAIN_ROWS)
+    return build_pipeline().fit(train[FEATURE_COLUMNS], train["Disease"])
+
+
+def _predict_single(df, tmp):
+    model = _small_model(df)
+    row = df[FEATURE_COLUMNS].head(1)
+
+    def run():
+        for _ in range(SINGLE_ROW_CALLS):
+            model.predict_proba(row)
+    return run, SINGLE_ROW_CALLS
+
+
+def _predict_batch(df, tmp):
+    model = _small_model(df)
+    X = df[FEATURE_COLUMNS]
+    return lambda: model.predict_proba(X), len(df)
+
+
+def _history_append(df, tmp):
+    # What append_prediction does per record (make_record + queue), into a
+    # fresh store each run, including the final flush to SQLite
+    import numpy as np
+
+    from src.history import HistoryWriter, make_record
+    from src.history_store import HistoryStore
+
+    classes = np.asarray(sorted(df["Disease"].unique()))
+    proba = np.random.default_rng(0).dirichlet(np.ones(len(classes)), size=len(df))
+    top_idx = np.argsort(-proba, axis=1)[:, :3]
+    rows = list(zip(df["Age"], df["Gender"], df["Symptoms"], df["Symptom_Count"]))
+
+    def run():
+        path = os.path.join(tmp, "history.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        store = HistoryStore(path)
+        writer = HistoryWriter(store)
+        for i, (age, gender, symptoms, count) in enumerate(rows):
+            writer.append(make_record(age, gender, symptoms, count,
+                                      classes, proba[i], top_idx[i]))
+        writer.close()
+        store.close()
+    return run, len(df)
+
+
+def _history_store(n_rows, tmp):
+    from benchmarks.datasets import synthetic_history_records
+    from src.history_store import HistoryStore
+
+    store = HistoryStore(os.path.join(tmp, "history.db"))
+    store.append_many(synthetic_history_records(n_rows))
+    return store
+
+
+def _history_aggregate(df, tmp):
+    # Full rebuild of the analytics aggregates (what the Analytics tab
+    # reads through analytics_summary) over len(df) history rows
+    from src.history_analytics import HistoryAggregates
+
+    store = _history_store(len(df), tmp)
+    path = os.path.join(tmp, "aggregates.json")
+    return lambda: HistoryAggregates(path).refresh(store, rebuild=True), len(df)
+
+
+def _history_page(df, tmp):
+    # Twenty consecutive filtered, sorted History tab pages
+    store = _history_store(len(df), tmp)
+
+    def run():
+        after = None
+        for _ in range(20):
+            _, after = store.page(sort_by="top1_prob", gender="Female", after=after)
+    return run, 20
+
+
+# name -> (setup, default max rows or None, size independent)
+CASES = {
+    "transform_fit": (_transform_fit, None, False),
+    "transform_dense": (_transform(False), None, False),
+    "transform_sparse": (_transform(True), None, False),
+    "transform_hashing": (_transform_hashing, None, False),
+    "transform_fuzzy": (_transform_fuzzy, None, False),
+    "pipeline_fit": (_pipeline_fit, 100_000, False),
+    "predict_single": (_predict_single, None, True),
+    "predict_batch": (_predict_batch, 100_000, False),
+    "history_append": (_history_append, 100_000, False),
+    "history_aggregate": (_history_aggregate, 100_000, False),
+    "history_page": (_history_page, 100_000, False),
+}
+
+
+def _run_case(name, n_rows, repeat, seed):
+    from benchmarks.datasets import synthetic_frame
+    from src.train_model import peak_rss_mb
+
+    setup = CASES[name][0]
+    df = synthetic_frame(n_rows, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        run, items = setup(df, tmp)
+        rss_before = peak_rss_mb()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+            if times[-1] > REPEAT_BUDGET_S:
+                break
+        rss_peak = peak_rss_mb()
+    best = min(times)
+    return {
+        "case": name,
+        "rows": n_rows,
+        "seconds": best,
+        "items": items,
+        "items_per_sec": items / best if best > 0 else None,
+        "runs": len(times),
+        "peak_rss_mb": rss_peak,
+        "peak_rss_delta_mb": None if rss_peak is None else rss_peak - rss_before,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=BENCH_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes=DEFAULT_SIZES, cases=None, full=False, repeat=3, seed=0):
+    results = []
+    # spawn, so no case inherits another's memory (or the parent's)
+    context = multiprocessing.get_context("spawn")
+    for name in cases or CASES:
+        _, max_rows, size_independent = CASES[name]
+        case_sizes = sizes[:1] if size_independent else sizes
+        for n_rows in case_sizes:
+            if max_rows is not None and n_rows > max_rows and not full:
+                print(f"{name:>20} {n_rows:>9,} rows  skipped (over {max_rows:,}; --full runs it)")
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                r = pool.submit(_run_case, name, n_rows, repeat, seed).result()
+            results.append(r)
+            print(f"{name:>20} {n_rows:>9,} rows  {r['seconds']:9.4f}s  "
+                  f"{r['items_per_sec']:>14,.0f} items/s  peak {r['peak_rss_mb'] or 0:8.1f} MB")
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.10):
+    """Print per-case time ratios; return the cases slower than threshold."""
+    base = {(r["case"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('timestamp')} "
+          f"(commit {baseline['meta'].get('commit')}):")
+    for r in current["results"]:
+        b = base.get((r["case"], r["rows"]))
+        if b is None:
+            continue
+        ratio = r["seconds"] / b["seconds"] if b["seconds"] else float("inf")
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESSION"
+            regressions.append(r)
+        elif ratio < 1 - threshold:
+            mark = "  faster"
+        print(f"{r['case']:>20} {r['rows']:>9,} rows  {b['seconds']:9.4f}s -> "
+              f"{r['seconds']:9.4f}s  ({ratio:5.2f}x){mark}")
+    return regressions
+
+
+def _write_json(data, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="10k,100k,1m",
+        help="comma-separated dataset sizes (default: 10k,100k,1m)",
+    )
+    parser.add_argument(
+        "--cases",
+        default=None,
+        help=f"comma-separated subset of: {', '.join(CASES)}",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="also run slow cases above their default size cap",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs (default: 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the JSON results")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"also save the results as the baseline ({os.path.relpath(BASELINE_PATH)})",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=BASELINE_PATH,
+        default=None,
+        metavar="PATH",
+        help="compare against a saved baseline (default: the saved baseline)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="slowdown counted as a regression in --compare mode (default: 0.10)",
+    )
+    args = parser.parse_args()
+    args.sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    if args.cases:
+        args.cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+        unknown = sorted(set(args.cases) - set(CASES))
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(unknown)}")
+    return args
+
+
+def main():
+    args = parse_args()
+    current = run_suite(args.sizes, args.cases, args.full, args.repeat, args.seed)
+    _write_json(current, args.output)
+    print(f"\nResults written to: {args.output}")
+    if args.save_baseline:
+        _write_json(current, BASELINE_PATH)
+        print(f"Baseline saved to: {BASELINE_PATH}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+
+class BarChart:
+    """
+    A matplotlib bar chart embedded in a Tk widget. The figure is created
+    once at the display size, so nothing is saved to disk or resized.
+    update() only touches the bar lengths when the labels are unchanged,
+    and does nothing at all when given the version it last drew.
+    """
+
+    def __init__(self, master, width=800, height=350, dpi=100, horizontal=False,
+                 title="", xlabel="", ylabel="", bg="#f4f7fb"):
+        self.horizontal = horizontal
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor=bg)
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.widget.configure(bg=bg, highlightthickness=0)
+
+        self.version = None
+        self.last_render_ms = 0.0
+        self._labels = None
+        self._bars = None
+
+    def pack(self, **kwargs):
+        self.widget.pack(**kwargs)
+
+    def pack_forget(self):
+        self.widget.pack_forget()
+
+    def update(self, labels, values, version=None):
+        """
+        Show values against labels. Returns False without redrawing when
+        version matches the one already on screen.
+        """
+        if version is not None and version == self.version:
+            return False
+        start = time.perf_counter()
+        labels = [str(label) for label in labels]
+        values = np.asarray(values, dtype=float)
+
+        if labels == self._labels:
+            for bar, value in zip(self._bars, values):
+                if self.horizontal:
+                    bar.set_width(value)
+                else:
+                    bar.set_height(value)
+            self.ax.relim()
+            self.ax.autoscale_view()
+        else:
+            self._rebuild(labels, values)
+
+        self.canvas.draw_idle()
+        self.version = version
+        self.last_render_ms = (time.perf_counter() - start) * 1000.0
+        return True
+
+    def _rebuild(self, labels, values):
+        ax = self.ax
+        ax.clear()
+        # Same light-to-dark ramp as the seaborn "Blues_r" palette
+        colors = colormaps["Blues_r"](np.linspace(0.15, 0.75, max(len(labels), 1)))
+        positions = np.arange(len(labels))
+        if self.horizontal:
+            self._bars = ax.barh(positions, values, color=colors)
+            ax.set_yticks(positions, labels, fontsize=8)
+            ax.invert_yaxis()
+        else:
+            self._bars = ax.bar(positions, values, color=colors)
+            ax.set_xticks(positions, labels, rotation=90, fontsize=7)
+        ax.set_title(self.title)
+        ax.set_xlabel(self.xlabel)
+        ax.set_ylabel(self.ylabel)
+        self.figure.tight_layout()
+        self._labels = labels
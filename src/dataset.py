@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(BASE_DIR, "data", "Healthcare.csv")
+CACHE_ROOT = os.path.join(BASE_DIR, "data", ".cache")
+
+COLUMNS = ["Age", "Gender", "Symptoms", "Symptom_Count", "Disease"]
+CACHE_FORMAT = 1
+
+
+def file_sha1(path, block_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_dir(path):
+    # Keyed on the full path, so two files with the same name elsewhere
+    # don't overwrite each other's cache; the stem keeps it recognizable
+    path = os.path.realpath(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CACHE_ROOT, f"{stem}-{digest}")
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != CACHE_FORMAT:
+        return None
+    if not os.path.isdir(os.path.join(cache_dir, meta.get("version", ""))):
+        return None
+    return meta
+
+
+def _write_meta(cache_dir, meta):
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    # mkstemp creates it owner-only; other users' processes read it too
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, os.path.join(cache_dir, "meta.json"))
+
+
+def _tokenize(texts, vocab_index):
+    # Same normalization as FullFeatureTransformer: split on commas,
+    # strip, lowercase, one entry per distinct symptom
+    indptr = [0]
+    indices = []
+    for text in texts:
+        cols = {vocab_index[s] for s in (p.strip().lower() for p in text.split(",")) if s}
+        indices.extend(sorted(cols))
+        indptr.append(len(indices))
+    return np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32)
+
+
+def build_cache(path=DATA_PATH, sha1=None):
+    """Parse the CSV once and store it as memory-mappable NumPy columns."""
+    cache_dir = _cache_dir(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(path)
+    sha1 = sha1 or file_sha1(path)
+
+    df = pd.read_csv(path, usecols=COLUMNS)
+    df = df.dropna(subset=["Symptoms", "Disease"]).reset_index(drop=True)
+
+    gender_codes, genders = pd.factorize(df["Gender"])
+    disease_codes, diseases = pd.factorize(df["Disease"], sort=True)
+    symptom_codes, texts = pd.factorize(df["Symptoms"].astype(str))
+    texts = [str(t) for t in texts]
+
+    vocab = sorted({
+        s for text in texts for s in (p.strip().lower() for p in text.split(",")) if s
+    })
+    text_indptr, text_indices = _tokenize(texts, {s: i for i, s in enumerate(vocab)})
+
+    # Arrays go into a fresh version directory; meta.json is switched over
+    # last, so readers never see a half-written cache.
+    version = f"{sha1[:12]}-{stat.st_mtime_ns}"
+    version_dir = os.path.join(cache_dir, version)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=".build-")
+    os.chmod(tmp_dir, 0o755)  # mkdtemp makes it owner-only
+    arrays = {
+        "age": df["Age"].to_numpy(),
+        "symptom_count": df["Symptom_Count"].to_numpy(),
+        "gender_codes": gender_codes.astype(np.int16),
+        "disease_codes": disease_codes.astype(np.int16),
+        "symptom_codes": symptom_codes.astype(np.int32),
+        "text_indptr": text_indptr,
+        "text_indices": text_indices,
+    }
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), arr)
+    with open(os.path.join(tmp_dir, "symptom_texts.json"), "w", encoding="utf-8") as f:
+        json.dump(texts, f)
+    if os.path.isdir(version_dir):
+        shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(tmp_dir, version_dir)
+
+    meta = {
+        "format": CACHE_FORMAT,
+        "version": version,
+        "source": os.path.abspath(path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": sha1,
+        "n_rows": len(df),
+        "genders": [str(g) for g in genders],
+        "diseases": [str(d) for d in diseases],
+        "symptom_vocab": vocab,
+    }
+    previous = _read_meta(cache_dir)
+    _write_meta(cache_dir, meta)
+    _drop_old_versions(cache_dir, version, previous and previous["version"])
+    return meta
+
+
+def _drop_old_versions(cache_dir, current, previous=None):
+    """
+    Remove finished versions older than current. Temporary build
+    directories (another process may be writing one), anything newer than
+    current and the version meta.json pointed at until now (a reader may
+    have just picked it) are left alone.
+    """
+    try:
+        current_mtime = os.stat(os.path.join(cache_dir, current)).st_mtime_ns
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if name in (current, previous) or name.startswith("."):
+            continue
+        full = os.path.join(cache_dir, name)
+        try:
+            if not os.path.isdir(full) or os.stat(full).st_mtime_ns >= current_mtime:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(full, ignore_errors=True)
+
+
+def ensure_cache(path=DATA_PATH):
+    """
+    Return the cache metadata for path, (re)building the cache if the
+    source changed. A matching mtime and size is trusted as is; otherwise
+    the file is hashed and only rebuilt if its content really changed.
+    """
+    cache_dir = _cache_dir(path)
+    meta = _read_meta(cache_dir)
+    stat = os.stat(path)
+    if meta is not None:
+        if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            return meta
+        sha1 = file_sha1(path)
+        if meta["sha1"] == sha1:
+            meta["mtime_ns"] = stat.st_mtime_ns
+            meta["size"] = stat.st_size
+            _write_meta(cache_dir, meta)
+            return meta
+        return build_cache(path, sha1=sha1)
+    return build_cache(path)
+
+
+class DatasetCache:
+    """Memory-mapped columns of a cached dataset."""
+
+    def __init__(self, path=DATA_PATH):
+        self.meta = ensure_cache(path)
+        version_dir = os.path.join(_cache_dir(path), self.meta["version"])
+
+        def load(name):
+            return np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.age = load("age")
+        self.symptom_count = load("symptom_count")
+        self.gender_codes = load("gender_codes")
+        self.disease_codes = load("disease_codes")
+        self.symptom_codes = load("symptom_codes")
+        self.text_indptr = load("text_indptr")
+        self.text_indices = load("text_indices")
+        self._texts_path = os.path.join(version_dir, "symptom_texts.json")
+        self._texts = None
+
+    def __len__(self):
+        return self.meta["n_rows"]
+
+    @property
+    def symptom_texts(self):
+        if self._texts is None:
+            with open(self._texts_path, encoding="utf-8") as f:
+                self._texts = np.asarray(json.load(f), dtype=object)
+        return self._texts
+
+    @staticmethod
+    def _decode(codes, categories):
+        values = np.asarray(list(categories) + [np.nan], dtype=object)
+        return values[np.asarray(codes)]  # code -1 picks the trailing NaN
+
+    def disease_counts(self):
+        counts = np.bincount(self.disease_codes, minlength=len(self.meta["diseases"]))
+        return pd.Series(counts, index=self.meta["diseases"])
+
+    def symptom_counts(self):
+        # Per-text token counts weighted by how many rows use each text
+        text_rows = np.bincount(self.symptom_codes, minlength=len(self.text_indptr) - 1)
+        tokens_per_text = np.diff(self.text_indptr)
+        weights = np.repeat(text_rows, tokens_per_text)
+        counts = np.bincount(
+            self.text_indices,
+            weights=weights,
+            minlength=len(self.meta["symptom_vocab"]),
+        )
+        return pd.Series(counts.astype(np.int64), index=self.meta["symptom_vocab"])
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "Age": np.asarray(self.age),
+            "Gender": self._decode(self.gender_codes, self.meta["genders"]),
+            "Symptoms": self.symptom_texts[np.asarray(self.symptom_codes)],
+            "Symptom_Count": np.asarray(self.symptom_count),
+            "Disease": self._decode(self.disease_codes, self.meta["diseases"]),
+        })
+
+
+def load_dataset(path=DATA_PATH, use_cache=True):
+    """
+    Load Age, Gender, Symptoms, Symptom_Count and Disease, dropping rows
+    without symptoms or disease. Goes through the columnar cache unless
+    use_cache is False.
+    """
+    if use_cache:
+        try:
+            return DatasetCache(path).to_frame()
+        except OSError as e:
+            # e.g. read-only data directory: fall back to parsing the CSV
+            print(f"Dataset cache unavailable ({e}), reading CSV directly.")
+    df = pd.read_csv(path, usecols=COLUMNS)
+    df = df.dropna(subset=["Symptoms", "Disease"])
+    return df.reset_index(drop=True)[COLUMNS]
+
+
+def dataset_hash(path=DATA_PATH):
+    return ensure_cache(path)["sha1"]
@@ -1,87 +1,263 @@
+import argparse
+import hashlib
+import json
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src import instrument
+from src.dataset import DatasetCache
+from src.stats_manifest import refresh_dataset_stats
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(BASE_DIR, "data", "Healthcare.csv")
 EDA_DIR = os.path.join(BASE_DIR, "reports", "eda_plots")
+# Input hash of each plot as last rendered; bump PLOT_FORMAT when the
+# drawing code changes so every plot is redrawn once
+STATE_PATH = os.path.join(EDA_DIR, ".eda_state.json")
+PLOT_FORMAT = 1
+
+AGE_BINS = 20
+TOP_SYMPTOMS = 15
 
 
 def ensure_dirs():
     os.makedirs(EDA_DIR, exist_ok=True)
 
 
-def load_data():
-    df = pd.read_csv(DATA_PATH)
-    df = df[["Age", "Gender", "Symptoms", "Symptom_Count", "Disease"]]
-    df = df.dropna(subset=["Symptoms", "Disease"])
-    return df
+def _gaussian_kde_curve(values, grid_size=200, fine_bins=1000):
+    """
+    Gaussian KDE (Scott's rule, as seaborn uses) evaluated on a grid.
+    The data is binned finely first and the kernel convolved over the
+    bins, so the cost is linear in the number of rows.
+    """
+    lo, hi = float(values.min()), float(values.max())
+    n = len(values)
+    bandwidth = float(values.std()) * n ** (-1 / 5)
+    if hi <= lo or bandwidth <= 0:
+        return np.array([lo, hi]), np.zeros(2)
+    counts, edges = np.histogram(values, bins=fine_bins, range=(lo, hi))
+    centers = (edges[:-1] + edges[1:]) / 2
+    grid = np.linspace(lo, hi, grid_size)
+    diff = (grid[:, None] - centers[None, :]) / bandwidth
+    density = (np.exp(-0.5 * diff ** 2) @ counts) / (n * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+def compute_aggregates(dataset, top_n=TOP_SYMPTOMS):
+    """
+    Every input the EDA plots need, computed in one pass over the cached
+    integer columns (bincounts and one histogram) instead of the raw
+    strings; symptoms are never re-split.
+    """
+    disease_counts = dataset.disease_counts().sort_values(ascending=False, kind="stable")
+
+    age = np.asarray(dataset.age, dtype=np.float64)
+    age = age[np.isfinite(age)]
+    hist, edges = np.histogram(age, bins=AGE_BINS)
+    grid, density = _gaussian_kde_curve(age)
+    # Scale the density to the histogram's counts, as histplot(kde=True) does
+    curve = density * len(age) * (edges[1] - edges[0])
+
+    symptom_counts = dataset.symptom_counts().sort_values(ascending=False, kind="stable")
+    symptom_counts = symptom_counts.head(top_n)
+
+    return {
+        "disease_counts": {
+            "labels": [str(x) for x in disease_counts.index],
+            "counts": disease_counts.values.tolist(),
+        },
+        "age_distribution": {
+            "hist": hist.tolist(),
+            "edges": edges.tolist(),
+            "kde_x": grid.tolist(),
+            "kde_y": curve.tolist(),
+        },
+        "top_symptoms": {
+            "labels": [str(x) for x in symptom_counts.index],
+            "counts": symptom_counts.values.tolist(),
+            "top_n": top_n,
+        },
+    }
+
+
+def aggregate_hash(aggregate):
+    payload = json.dumps([PLOT_FORMAT, aggregate], sort_keys=True).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
 
 
-def plot_disease_counts(df):
+def _pyplot():
+    # Imported on first use, so a run with nothing to redraw never pays for
+    # matplotlib; Agg because plots may render in worker processes
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_disease_counts(agg, path):
+    import seaborn as sns
+
+    plt = _pyplot()
+
     plt.figure(figsize=(10, 5))
-    order = df["Disease"].value_counts().index
-    sns.countplot(data=df, x="Disease", order=order, palette="Blues_r")
+    sns.barplot(
+        x=agg["labels"],
+        y=agg["counts"],
+        hue=agg["labels"],
+        palette="Blues_r",
+        legend=False,
+    )
     plt.xticks(rotation=90)
     plt.xlabel("Disease")
     plt.ylabel("Number of patients")
     plt.title("Number of Patients per Disease")
     plt.tight_layout()
-    path = os.path.join(EDA_DIR, "disease_counts.png")
     plt.savefig(path, dpi=120)
     plt.close()
 
 
-def plot_age_distribution(df):
+def plot_age_distribution(agg, path):
+    from matplotlib.colors import to_rgba
+
+    plt = _pyplot()
+
+    edges = np.asarray(agg["edges"])
     plt.figure(figsize=(8, 4))
-    sns.histplot(data=df, x="Age", bins=20, kde=True, color="#22b8a7")
+    # Half-transparent fill with solid edges, like sns.histplot
+    plt.bar(
+        edges[:-1],
+        agg["hist"],
+        width=np.diff(edges),
+        align="edge",
+        color=to_rgba("#22b8a7", 0.5),
+        edgecolor="black",
+    )
+    plt.plot(agg["kde_x"], agg["kde_y"], color="#22b8a7")
     plt.xlabel("Age")
     plt.ylabel("Count")
     plt.title("Age Distribution of Patients")
     plt.tight_layout()
-    path = os.path.join(EDA_DIR, "age_distribution.png")
     plt.savefig(path, dpi=120)
     plt.close()
 
 
-def plot_top_symptoms(df, top_n=15):
-    # explode symptoms
-    s = (
-        df["Symptoms"]
-        .fillna("")
-        .str.split(",")
-        .explode()
-        .str.strip()
-        .str.lower()
-    )
-    counts = s.value_counts().head(top_n)
+def plot_top_symptoms(agg, path):
+    import seaborn as sns
+
+    plt = _pyplot()
 
     plt.figure(figsize=(8, 5))
     sns.barplot(
-        x=counts.values,
-        y=counts.index,
+        x=agg["counts"],
+        y=agg["labels"],
+        hue=agg["labels"],
         palette="viridis",
         orient="h",
+        legend=False,
     )
     plt.xlabel("Frequency")
     plt.ylabel("Symptom")
-    plt.title(f"Top {top_n} Symptoms")
+    plt.title(f"Top {agg['top_n']} Symptoms")
     plt.tight_layout()
-    path = os.path.join(EDA_DIR, "top_symptoms.png")
     plt.savefig(path, dpi=120)
     plt.close()
 
 
-def run_eda():
+PLOTS = {
+    "disease_counts": plot_disease_counts,
+    "age_distribution": plot_age_distribution,
+    "top_symptoms": plot_top_symptoms,
+}
+
+
+def _render(name, aggregate):
+    start = time.perf_counter()
+    PLOTS[name](aggregate, os.path.join(EDA_DIR, f"{name}.png"))
+    return name, time.perf_counter() - start
+
+
+def _read_state():
+    try:
+        with open(STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(state):
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+def run_eda(force=False, jobs=None):
+    """
+    Compute the aggregates, then redraw only the plots whose input hash
+    differs from the last run (or whose PNG is missing), each in its own
+    worker process.
+    """
     ensure_dirs()
-    df = load_data()
-    plot_disease_counts(df)
-    plot_age_distribution(df)
-    plot_top_symptoms(df)
-    print(f"Charts saved to: {EDA_DIR}")
+    start = time.perf_counter()
+    with instrument.span("eda.aggregates"):
+        aggregates = compute_aggregates(DatasetCache(DATA_PATH))
+    print(f"Aggregates computed in {time.perf_counter() - start:.3f}s")
+
+    state = _read_state()
+    hashes = {name: aggregate_hash(agg) for name, agg in aggregates.items()}
+    todo = [
+        name for name in PLOTS
+        if force
+        or state.get(name) != hashes[name]
+        or not os.path.exists(os.path.join(EDA_DIR, f"{name}.png"))
+    ]
+    for name in PLOTS:
+        if name not in todo:
+            print(f"  {name}: unchanged, skipped")
+
+    workers = min(len(todo), jobs or os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render, name, aggregates[name]) for name in todo]
+            results = [f.result() for f in futures]
+    else:
+        # One plot or one core: a worker process would only add startup time
+        results = [_render(name, aggregates[name]) for name in todo]
+
+    for name, seconds in results:
+        print(f"  {name}: rendered in {seconds:.2f}s")
+        # Measured in the worker, so recorded here rather than with span()
+        instrument.record(f"eda.plot.{name}", seconds)
+        state[name] = hashes[name]
+    if results:
+        _write_state(state)
+
+    refresh_dataset_stats(DATA_PATH)
+    print(f"Charts saved to: {EDA_DIR} ({time.perf_counter() - start:.2f}s)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Render the EDA charts.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="redraw every plot even if its inputs are unchanged",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes for rendering (default: one per CPU)",
+    )
+    instrument.add_arguments(parser)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_eda()
+    args = parse_args()
+    instrument.configure(args)
+    run_eda(force=args.force, jobs=args.jobs)
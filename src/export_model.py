@@ -0,0 +1,102 @@
+"""
+Export the trained forest as memory-mappable flat arrays.
+
+    python -m src.export_model [--compact] [--value-dtype float16]
+                               [--max-depth 16] [--min-samples-leaf 5]
+                               [--output models/disease_model_flat | --publish]
+
+The output directory holds one uncompressed .npy per array plus
+meta.json. load_model() maps it read-only instead of unpickling, so
+loading is near-instant and processes serving the same model share one
+copy through the page cache.
+
+Once the model registry has a current version, the GUI, predict_batch and
+serve load from it and ignore --output; deploy a variant with --publish,
+which adds it to the registry as a new version and makes it current, or
+point a tool at the export with its --model option.
+"""
+import argparse
+import os
+import time
+
+import joblib
+
+from src.forest_engine import CompiledModel
+from src.model_registry import FLAT_NAME, ModelRegistry
+from src.train_model import FLAT_MODEL_PATH, MODEL_PATH, export_flat_model
+
+
+VALUE_DTYPES = ["float64", "float32", "float16"]
+
+
+def dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=MODEL_PATH, help="trained pipeline (.joblib)")
+    parser.add_argument("--output", default=FLAT_MODEL_PATH, help="export directory")
+    parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="publish the pipeline with this export as a new registry version (instead of --output)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="store indices in the smallest int type and thresholds as float32",
+    )
+    parser.add_argument(
+        "--value-dtype",
+        choices=VALUE_DTYPES,
+        default="float32",
+        help="leaf probability dtype with --compact (default: float32)",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=None,
+        help="prune every tree to this depth",
+    )
+    parser.add_argument(
+        "--min-samples-leaf",
+        type=int,
+        default=None,
+        help="prune splits that leave a child with fewer training samples",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    model = joblib.load(args.model)
+    options = {
+        "compact": args.compact,
+        "value_dtype": args.value_dtype,
+        "max_depth": args.max_depth,
+        "min_samples_leaf": args.min_samples_leaf,
+    }
+    if args.publish:
+        registry = ModelRegistry()
+        clf = model.named_steps.get("clf")
+        version = registry.publish(
+            model,
+            {"model": type(clf).__name__, "source": os.path.abspath(args.model)},
+            flat=True,
+            flat_options=options,
+        )
+        output = os.path.join(registry.version_dir(version), FLAT_NAME)
+        print(f"Published as version {version}")
+    else:
+        export_flat_model(model, args.output, **options)
+        output = args.output
+    forest = CompiledModel.load(output).forest
+    print(f"{forest.n_trees} trees, {forest.n_nodes:,} nodes, max depth {forest.max_depth}")
+    print(f"Exported to: {output} ({dir_size(output) / 2**20:.1f} MB, "
+          f"{time.perf_counter() - start:.1f}s)")
@@ -0,0 +1,429 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+# Upper bound on rows * trees * classes held in memory at once while
+# averaging leaf probabilities
+_BLOCK_CELLS = 4_000_000
+
+# Directory export: one .npy per array plus meta.json, so the arrays can
+# be memory-mapped; bump ARTIFACT_FORMAT if the layout changes
+ARTIFACT_FORMAT = 1
+ARRAY_NAMES = ("feature", "threshold", "children", "leaf_index", "leaf_value", "roots")
+META_NAME = "meta.json"
+
+
+def _int_dtype(max_value):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _float32_floor(values):
+    """
+    Cast to float32 rounding down, so that for any float32 x,
+    x <= result exactly when x <= the original float64 value.
+    """
+    out = values.astype(np.float32)
+    over = out.astype(np.float64) > values
+    out[over] = np.nextafter(out[over], np.float32(-np.inf))
+    return out
+
+
+def _tree_nodes(tree, max_depth=None, min_samples_leaf=None):
+    """
+    Node arrays of one fitted sklearn tree, optionally cut back so no leaf
+    is deeper than max_depth and no split leaves a child with fewer than
+    min_samples_leaf training samples. A cut split becomes a leaf that
+    predicts its own class distribution. Kept nodes are renumbered in
+    their original order; returns (is_leaf, feature, threshold, left,
+    right, value, depth).
+    """
+    left, right = tree.children_left, tree.children_right
+    samples = tree.n_node_samples
+    is_leaf = left == -1
+    kept, levels = [], []
+    frontier = np.array([0])
+    depth = 0
+    # Walk the tree one level at a time, stopping at cut splits
+    while frontier.size:
+        cut = is_leaf[frontier].copy()
+        if max_depth is not None and depth >= max_depth:
+            cut[:] = True
+        if min_samples_leaf:
+            split = ~cut
+            smallest = np.minimum(samples[left[frontier[split]]], samples[right[frontier[split]]])
+            cut[split] = smallest < min_samples_leaf
+        kept.append(frontier)
+        levels.append(np.full(frontier.size, depth))
+        is_leaf[frontier] = cut
+        grow = frontier[~cut]
+        frontier = np.concatenate([left[grow], right[grow]])
+        depth += 1
+
+    kept = np.concatenate(kept)
+    order = np.argsort(kept)
+    kept = kept[order]
+    node_depth = np.concatenate(levels)[order]
+    new_id = np.full(tree.node_count, -1, dtype=np.int64)
+    new_id[kept] = np.arange(kept.size)
+    leaf = is_leaf[kept]
+    return (
+        leaf,
+        np.where(leaf, 0, tree.feature[kept]),
+        tree.threshold[kept],
+        np.where(leaf, -1, new_id[left[kept]]),
+        np.where(leaf, -1, new_id[right[kept]]),
+        tree.value[kept, 0, :],
+        int(node_depth.max()),
+    )
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous arrays.
+
+    All trees share one node numbering and roots[t] is the first node of
+    tree t. leaf_index maps a leaf node to its row in leaf_value (the
+    normalized class probabilities) and is -1 for split nodes. Traversal
+    advances every (row, tree) pair one level at a time with NumPy
+    gathers, so a whole batch is scored across all trees at once.
+    """
+
+    def __init__(self, feature, threshold, children, leaf_index,
+                 leaf_value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        # children[i] = (left, right); split nodes only
+        self.children = children
+        self.leaf_index = leaf_index
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, forest, max_depth=None, min_samples_leaf=None):
+        """
+        Flatten a fitted forest. max_depth and min_samples_leaf prune each
+        tree on the way (see _tree_nodes); by default it is copied as is.
+        """
+        features, thresholds, children = [], [], []
+        leaf_indices, leaf_values, roots = [], [], []
+        offset = 0
+        n_leaves = 0
+        deepest = 0
+        for est in forest.estimators_:
+            is_leaf, feature, threshold, left, right, value, depth = _tree_nodes(
+                est.tree_, max_depth, min_samples_leaf
+            )
+            n = len(is_leaf)
+            node_ids = np.arange(n)
+
+            features.append(feature)
+            thresholds.append(threshold)
+            children.append(np.column_stack([
+                np.where(is_leaf, node_ids, left) + offset,
+                np.where(is_leaf, node_ids, right) + offset,
+            ]))
+
+            leaf_idx = np.full(n, -1, dtype=np.int64)
+            leaf_idx[is_leaf] = np.arange(is_leaf.sum()) + n_leaves
+            leaf_indices.append(leaf_idx)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = value[is_leaf]
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            leaf_values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += n
+            n_leaves += int(is_leaf.sum())
+            deepest = max(deepest, depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            leaf_index=np.concatenate(leaf_indices).astype(np.int32),
+            leaf_value=np.concatenate(leaf_values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=deepest,
+        )
+
+    def compact(self, value_dtype=np.float32):
+        """
+        Copy with every array in the smallest dtype that holds it: indices
+        in int8/int16/int32, thresholds in float32 and leaf probabilities
+        in value_dtype (float16 halves them again at ~1e-3 precision).
+        Thresholds are rounded down, so splits send every float32 input
+        the same way as before and only the probabilities can change.
+        """
+        index_dtype = _int_dtype(max(self.n_nodes, len(self.leaf_value)))
+        return FlatForest(
+            feature=self.feature.astype(_int_dtype(int(self.feature.max(initial=0)))),
+            threshold=_float32_floor(np.asarray(self.threshold, dtype=np.float64)),
+            children=self.children.astype(index_dtype),
+            leaf_index=self.leaf_index.astype(index_dtype),
+            leaf_value=self.leaf_value.astype(value_dtype),
+            roots=self.roots.astype(index_dtype),
+            max_depth=self.max_depth,
+        )
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def apply(self, X):
+        """Leaf node reached in every tree, shape (n_samples, n_trees)."""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        flat_children = self.children.ravel()
+        # Tree-major order keeps each tree's nodes close together in memory
+        node = np.repeat(self.roots, n_samples).astype(np.int64)
+        row_start = np.tile(np.arange(n_samples) * n_features, self.n_trees)
+        # Only (row, tree) pairs that haven't reached a leaf are advanced
+        active = np.flatnonzero(self.leaf_index[node] < 0)
+        while active.size:
+            cur = node[active]
+            go_right = ~(flat_X[row_start[active] + self.feature[cur]] <= self.threshold[cur])
+            nxt = flat_children[2 * cur + go_right]
+            node[active] = nxt
+            active = active[self.leaf_index[nxt] < 0]
+        return node.reshape(self.n_trees, n_samples).T
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        n_classes = self.leaf_value.shape[1]
+        proba = np.empty((X.shape[0], n_classes), dtype=np.float64)
+        block = max(1, _BLOCK_CELLS // (self.n_trees * n_classes))
+        for start in range(0, X.shape[0], block):
+            leaves = self.leaf_index[self.apply(X[start:start + block])]
+            proba[start:start + block] = self.leaf_value[leaves].mean(axis=1, dtype=np.float64)
+        return proba
+
+
+class CompiledModel:
+    """
+    FlatForest plus the feature layout of FullFeatureTransformer, so rows
+    can be scored straight from (age, gender, symptom indices) without
+    building a DataFrame.
+    """
+
+    def __init__(self, forest, classes, symptom_vocab, genders, info=None):
+        self.forest = forest
+        # How the arrays were produced (pruning, dtypes), kept in meta.json
+        self.info = dict(info or {})
+        self.classes_ = np.asarray(classes)
+        self.symptom_vocab = list(symptom_vocab)
+        self.genders = list(genders)
+        self.symptom_index = {s: i for i, s in enumerate(self.symptom_vocab)}
+        self.gender_to_idx = {g: i for i, g in enumerate(self.genders)}
+        self.n_features = 2 + len(self.genders) + len(self.symptom_vocab)
+
+    @classmethod
+    def from_pipeline(cls, model, max_depth=None, min_samples_leaf=None,
+                      compact=False, value_dtype=np.float32):
+        features = model.named_steps["features"]
+        clf = model.named_steps["clf"]
+        genders = sorted(features.gender_to_idx_, key=features.gender_to_idx_.get)
+        forest = FlatForest.from_sklearn(clf, max_depth, min_samples_leaf)
+        if compact:
+            forest = forest.compact(value_dtype)
+        return cls(
+            forest,
+            classes=clf.classes_,
+            symptom_vocab=features.symptom_vocab_,
+            genders=genders,
+            info={"prune_depth": max_depth, "prune_min_samples_leaf": min_samples_leaf},
+        )
+
+    def symptom_indices(self, symptoms):
+        """Vocabulary indices for a list of symptom strings (unknown ones dropped)."""
+        idx = (self.symptom_index.get(s.strip().lower()) for s in symptoms)
+        return sorted({i for i in idx if i is not None})
+
+    def encode(self, ages, genders, symptom_indices, symptom_counts=None):
+        """
+        Build the dense feature matrix from per-row ages, gender labels and
+        lists of symptom vocabulary indices. symptom_counts defaults to the
+        length of each index list.
+        """
+        n = len(ages)
+        n_genders = len(self.genders)
+        X = np.zeros((n, self.n_features), dtype=np.float32)
+        X[:, 0] = ages
+        if symptom_counts is None:
+            symptom_counts = [len(idx) for idx in symptom_indices]
+        X[:, 1] = symptom_counts
+        for i, g in enumerate(genders):
+            j = self.gender_to_idx.get(str(g).strip().title())
+            if j is not None:
+                X[i, 2 + j] = 1.0
+        for i, idx in enumerate(symptom_indices):
+            if len(idx):
+                X[i, 2 + n_genders + np.asarray(idx)] = 1.0
+        return X
+
+    def predict_proba(self, X):
+        return self.forest.predict_proba(X)
+
+    def predict_proba_indices(self, ages, genders, symptom_indices, symptom_counts=None):
+        return self.forest.predict_proba(
+            self.encode(ages, genders, symptom_indices, symptom_counts)
+        )
+
+    def predict_proba_frame(self, X):
+        """
+        Probabilities for a raw Age/Gender/Symptoms/Symptom_Count frame,
+        with the same missing-value handling as FullFeatureTransformer.
+        """
+        ages = X["Age"].fillna(X["Age"].median()).to_numpy(dtype=float)
+        counts = X["Symptom_Count"].fillna(X["Symptom_Count"].median()).to_numpy(dtype=float)
+        genders = X["Gender"].fillna("Other").tolist()
+        indices = [self.symptom_indices(str(t).split(",")) for t in X["Symptoms"].fillna("")]
+        return self.predict_proba_indices(ages, genders, indices, counts)
+
+    def save(self, path):
+        """Save to a directory of .npy files, or to one .npz if path ends in .npz."""
+        if not path.lower().endswith(".npz"):
+            self.save_dir(path)
+            return
+        f = self.forest
+        np.savez(
+            path,
+            feature=f.feature,
+            threshold=f.threshold,
+            children=f.children,
+            leaf_index=f.leaf_index,
+            leaf_value=f.leaf_value,
+            roots=f.roots,
+            max_depth=np.asarray(f.max_depth),
+            classes=np.asarray(self.classes_, dtype=str),
+            symptom_vocab=np.asarray(self.symptom_vocab, dtype=str),
+            genders=np.asarray(self.genders, dtype=str),
+        )
+
+    def save_dir(self, path):
+        """
+        Write each array uncompressed to its own .npy so load() can map it.
+        The directory is built next to path and renamed into place, so a
+        process that has the old arrays mapped keeps reading the old files.
+        """
+        path = os.path.abspath(path)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        f = self.forest
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(getattr(f, name)))
+        meta = {
+            "format": ARTIFACT_FORMAT,
+            "max_depth": f.max_depth,
+            "n_trees": f.n_trees,
+            "n_nodes": f.n_nodes,
+            "dtypes": {name: str(getattr(f, name).dtype) for name in ARRAY_NAMES},
+            "classes": [str(c) for c in self.classes_],
+            "symptom_vocab": self.symptom_vocab,
+            "genders": self.genders,
+            **self.info,
+        }
+        with open(os.path.join(tmp, META_NAME), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=2)
+
+        old = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.rename(path, old)
+        os.rename(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """
+        Load a save() directory or .npz. Directory arrays are memory-mapped
+        by default (mmap_mode=None reads them into memory), so processes
+        loading the same model share its pages through the page cache.
+        """
+        if os.path.isdir(path):
+            return cls._load_dir(path, mmap_mode)
+        with np.load(path, allow_pickle=False) as data:
+            forest = FlatForest(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                children=data["children"],
+                leaf_index=data["leaf_index"],
+                leaf_value=data["leaf_value"],
+                roots=data["roots"],
+                max_depth=int(data["max_depth"]),
+            )
+            return cls(
+                forest,
+                classes=data["classes"].tolist(),
+                symptom_vocab=data["symptom_vocab"].tolist(),
+                genders=data["genders"].tolist(),
+            )
+
+    @classmethod
+    def _load_dir(cls, path, mmap_mode):
+        with open(os.path.join(path, META_NAME), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"{path}: unsupported model format {meta.get('format')!r}")
+        arrays = {
+            # asarray drops the memmap subclass but keeps the mapping
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"),
+                                     mmap_mode=mmap_mode, allow_pickle=False))
+            for name in ARRAY_NAMES
+        }
+        info = {k: meta[k] for k in ("prune_depth", "prune_min_samples_leaf") if k in meta}
+        return cls(
+            FlatForest(max_depth=meta["max_depth"], **arrays),
+            classes=meta["classes"],
+            symptom_vocab=meta["symptom_vocab"],
+            genders=meta["genders"],
+            info=info,
+        )
+
+
+class FlatPipeline:
+    """
+    Stand-in for the saved sklearn Pipeline backed by a CompiledModel:
+    predict_proba/predict take the same raw DataFrame and classes_ is the
+    same, so callers can use either.
+    """
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.classes_ = compiled.classes_
+
+    def predict_proba(self, X):
+        return self.compiled.predict_proba_frame(X)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_model(path, mmap_mode="r"):
+    """
+    Load a model for prediction: a flat export (directory or .npz) as a
+    FlatPipeline, anything else as a joblib pickle of the Pipeline.
+    """
+    if os.path.isdir(path) or path.lower().endswith(".npz"):
+        return FlatPipeline(CompiledModel.load(path, mmap_mode))
+    import joblib
+
+    return joblib.load(path)
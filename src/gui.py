@@ -1,45 +1,96 @@
-import os
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import importlib
+from datetime import datetime, timedelta
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
 
-import joblib
-import pandas as pd
-
-from PIL import Image, ImageTk
-
-from src.history import append_prediction, HISTORY_PATH
-import csv
-from datetime import datetime
-
-def append_prediction(age, gender, symptoms, symptom_count, classes, proba, top_idx):
-    os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
-
-    predicted = classes[top_idx[0]]
-    row = {
-        "timestamp": datetime.now().isoformat(timespec="seconds"),
-        "age": age,
-        "gender": gender,
-        "symptoms": symptoms,
-        "symptom_count": symptom_count,
-        "predicted_disease": predicted,
-        "top1_prob": float(proba[top_idx[0]]),
-        "top2_disease": classes[top_idx[1]] if len(top_idx) > 1 else "",
-        "top2_prob": float(proba[top_idx[1]]) if len(top_idx) > 1 else 0.0,
-        "top3_disease": classes[top_idx[2]] if len(top_idx) > 2 else "",
-        "top3_prob": float(proba[top_idx[2]]) if len(top_idx) > 2 else 0.0,
-    }
-
-    file_exists = os.path.exists(HISTORY_PATH)
-    with open(HISTORY_PATH, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=row.keys())
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(row)
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "models", "disease_model.joblib")
-EDA_DIR = os.path.join(BASE_DIR, "reports", "eda_plots")
-HISTORY_PATH = os.path.join(BASE_DIR, "data", "prediction_history.csv")
+from src import instrument
+
+# Everything else (numpy, pandas, sklearn, matplotlib, the model) is
+# imported lazily, so the login window only needs tkinter
+
+POLL_MS = 30
+# How often the dashboard checks the stats manifest and dataset for changes
+STATS_POLL_MS = 2000
+
+ANALYTICS_EMPTY_TEXT = "No prediction history yet. Make some predictions first."
+
+HISTORY_PAGE_SIZE = 20
+# (store column, heading, width); every column here except symptoms is sortable
+HISTORY_VIEW_COLUMNS = [
+    ("timestamp", "Time", 150),
+    ("age", "Age", 60),
+    ("gender", "Gender", 80),
+    ("symptoms", "Symptoms", 380),
+    ("predicted_disease", "Predicted disease", 220),
+    ("top1_prob", "Probability", 90),
+]
+
+# Imported on a background thread while the login window is up, roughly
+# in dependency order so each timing is that module's own cost
+WARM_MODULES = [
+    "numpy",
+    "pandas",
+    "joblib",
+    "sklearn.ensemble",
+    "src.preprocessing",
+    "src.prediction_cache",
+    "src.dataset",
+    "src.history",
+    "matplotlib.figure",
+    "matplotlib.backends.backend_tkagg",
+    "src.charts",
+]
+
+
+class StartupProfile:
+    """Import and phase timings, in ms since this module started loading."""
+
+    def __init__(self):
+        self.enabled = False
+        self.imports = {}
+        self.phases = {}
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - _T0) * 1000.0
+
+    def mark(self, phase):
+        self.phases.setdefault(phase, self.elapsed_ms())
+
+    def timed_import(self, name):
+        start = time.perf_counter()
+        importlib.import_module(name)
+        self.imports[name] = (time.perf_counter() - start) * 1000.0
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("\nStartup profile")
+        print("  imports (background warm-up):")
+        for name, ms in self.imports.items():
+            print(f"    {name:<36} {ms:8.1f} ms")
+        print("  phases (since start):")
+        for phase, ms in sorted(self.phases.items(), key=lambda kv: kv[1]):
+            print(f"    {phase:<36} {ms:8.1f} ms")
+
+
+PROFILE = StartupProfile()
+
+
+def warm_imports():
+    for name in WARM_MODULES:
+        try:
+            PROFILE.timed_import(name)
+        except Exception as e:
+            print(f"Warm-up import of {name} failed: {e}")
+    PROFILE.mark("warm-up imports done")
+
 
 print("Starting SymptoCare GUI...")
 class LoginWindow(tk.Tk):
@@ -54,6 +105,9 @@ class LoginWindow(tk.Tk):
         self.password_var = tk.StringVar()
 
         self._build_ui()
+        self.after_idle(lambda: PROFILE.mark("login shown"))
+        # Pay for the heavy imports while the user types credentials
+        threading.Thread(target=warm_imports, name="gui-warmup", daemon=True).start()
 
     def _build_ui(self):
         # Centered card, enough height to show button
@@ -136,16 +190,101 @@ class MainApp(tk.Tk):
         self.configure(bg="#f4f7fb")
 
         self.username = username
-        self.model = None
+        self.predictor = None
+        self._started = time.perf_counter()
+        # Model loading and predictions run here, never on the Tk event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-worker")
+        # History pages and dataset stats are read on their own thread so
+        # they never wait behind a model load
+        self.io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-io")
 
         self._load_model()
         self._build_layout()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after_idle(self._on_first_paint)
+
+    def _on_close(self):
+        from src.history import close_history
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.io_executor.shutdown(wait=False, cancel_futures=True)
+        # Make sure queued history records reach the database
+        close_history()
+        self.destroy()
+
+    def _elapsed_ms(self):
+        return (time.perf_counter() - self._started) * 1000.0
+
+    def _on_first_paint(self):
+        self.first_paint_ms = self._elapsed_ms()
+        print(f"Time to first paint: {self.first_paint_ms:.0f} ms")
+        PROFILE.mark("dashboard first paint")
+
+    def _run_in_background(self, fn, on_done, on_error, executor=None):
+        """
+        Run fn on the worker thread and hand its result (or exception) to
+        on_done / on_error on the Tk thread, by polling with after().
+        """
+        future = (executor or self.executor).submit(fn)
+
+        def poll():
+            if not future.done():
+                self.after(POLL_MS, poll)
+            elif future.exception() is not None:
+                on_error(future.exception())
+            else:
+                on_done(future.result())
+
+        self.after(POLL_MS, poll)
 
     def _load_model(self):
-        try:
-            self.model = joblib.load(MODEL_PATH)
-        except Exception as e:
-            messagebox.showerror("Model error", f"Could not load model:\n{e}")
+        def load():
+            from src.prediction_cache import CachedPredictor, default_model_path
+
+            # The memory-mapped flat export if it's up to date; reloads
+            # automatically when the model file changes
+            return CachedPredictor(default_model_path())
+
+        self._run_in_background(
+            load,
+            self._on_model_ready,
+            self._on_model_error,
+        )
+
+    def _on_model_ready(self, predictor):
+        self.predictor = predictor
+        self.model_ready_ms = self._elapsed_ms()
+        print(f"Time to model ready: {self.model_ready_ms:.0f} ms")
+        PROFILE.mark("model loaded")
+        PROFILE.report()
+        name = f"Model {predictor.version}" if predictor.version else "Model"
+        self.model_status.config(
+            text=f"{name} ready ({self.model_ready_ms / 1000:.1f} s)", fg="#16a34a"
+        )
+        self._shown_model = (predictor.version, None)
+        self.predict_btn.config(state="normal", text="Predict Disease")
+
+    def _show_model_status(self):
+        # Called from the dashboard poll: reflect background model swaps
+        predictor = self.predictor
+        state = (predictor.version, predictor.reload_error)
+        if state == self._shown_model:
+            return
+        self._shown_model = state
+        if predictor.reload_error is not None:
+            self.model_status.config(
+                text="New model failed to load, still using the previous one", fg="#d97706"
+            )
+        else:
+            name = f"Model {predictor.version}" if predictor.version else "Model"
+            self.model_status.config(text=f"{name} ready", fg="#16a34a")
+
+    def _on_model_error(self, error):
+        PROFILE.mark("model failed")
+        PROFILE.report()
+        self.model_status.config(text="Model failed to load", fg="#dc2626")
+        self.predict_btn.config(text="Model unavailable")
+        messagebox.showerror("Model error", f"Could not load model:\n{error}")
 
     def _build_layout(self):
         self.grid_columnconfigure(1, weight=1)
@@ -250,58 +389,147 @@ class MainApp(tk.Tk):
         self._build_analytics_tab()
         self._build_history_tab()
         self._refresh_analytics()
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        PROFILE.mark("dashboard built")
+
+    def _on_tab_changed(self, event):
+        if self.notebook.select() == str(self.analytics_tab):
+            self._refresh_analytics()
+        elif self.notebook.select() == str(self.history_tab):
+            self._history_reload()
 
     def _select_tab(self, index: int):
         self.notebook.select(index - 1)
 
     # Dashboard tab
     def _build_dashboard_tab(self):
+        from src.charts import BarChart
+
         cards_frame = tk.Frame(self.dashboard_tab, bg="#f4f7fb")
         cards_frame.pack(fill="x", padx=8, pady=(12, 4))
 
-        def make_card(parent, title, value, color):
+        def make_card(parent, title, color):
             frame = tk.Frame(parent, bg="white", bd=0, highlightthickness=0)
             frame.pack(side="left", padx=8, pady=4, fill="x", expand=True)
-            tk.Label(
+            title_label = tk.Label(
                 frame,
                 text=title,
                 font=("Segoe UI", 9),
                 bg="white",
                 fg="#6b7280",
-            ).pack(anchor="w", padx=12, pady=(10, 2))
-            tk.Label(
+            )
+            title_label.pack(anchor="w", padx=12, pady=(10, 2))
+            value_label = tk.Label(
                 frame,
-                text=value,
+                text="...",
                 font=("Segoe UI", 18, "bold"),
                 bg="white",
                 fg=color,
-            ).pack(anchor="w", padx=12, pady=(0, 10))
+            )
+            value_label.pack(anchor="w", padx=12, pady=(0, 10))
+            return title_label, value_label
 
-        make_card(cards_frame, "Total Patients", "5000", "#22b8a7")
-        make_card(cards_frame, "Diseases", "30", "#0ea5e9")
-        make_card(cards_frame, "Model Accuracy", "3.2%", "#f97316")
+        self.dashboard_cards = {
+            "patients": make_card(cards_frame, "Total Patients", "#22b8a7"),
+            "diseases": make_card(cards_frame, "Diseases", "#0ea5e9"),
+            "accuracy": make_card(cards_frame, "Model Accuracy", "#f97316"),
+            "training": make_card(cards_frame, "Training Time", "#8b5cf6"),
+        }
 
         body = tk.Frame(self.dashboard_tab, bg="#f4f7fb")
         body.pack(fill="both", expand=True, padx=8, pady=8)
 
-        # show disease_counts.png in the center
-        img_path = os.path.join(EDA_DIR, "disease_counts.png")
-        if os.path.exists(img_path):
-            img = Image.open(img_path)
-            img = img.resize((800, 350), Image.LANCZOS)
-            self.dashboard_img = ImageTk.PhotoImage(img)
-            lbl = tk.Label(body, image=self.dashboard_img, bg="#f4f7fb")
-            lbl.pack(pady=10)
-        else:
-            placeholder = tk.Label(
-                body,
-                text="Run: python -m src.eda to generate dashboard charts.",
-                font=("Segoe UI", 11),
-                bg="#f4f7fb",
-                fg="#6b7280",
-            )
-            placeholder.pack(pady=40)
+        self.dashboard_placeholder = tk.Label(
+            body,
+            text="Loading dataset statistics...",
+            font=("Segoe UI", 11),
+            bg="#f4f7fb",
+            fg="#6b7280",
+        )
+        self.dashboard_placeholder.pack(pady=40)
+        self.dashboard_chart = BarChart(
+            body,
+            title="Number of patients per disease",
+            ylabel="Count",
+        )
 
+        self._stats_signature = None
+        self._dataset_signature = None
+        self._poll_dashboard()
+
+    def _poll_dashboard(self):
+        """
+        Update the cards when the stats manifest changes, and have the
+        dataset section rewritten when the dataset itself changes. Only two
+        stat() calls per poll; the raw data is never read here.
+        """
+        from src.stats_manifest import DATA_PATH, STATS_PATH, file_signature, read_stats
+
+        dataset_signature = file_signature(DATA_PATH)
+        if dataset_signature != self._dataset_signature:
+            self._dataset_signature = dataset_signature
+            self._refresh_dataset_stats()
+
+        stats_signature = file_signature(STATS_PATH)
+        if stats_signature != self._stats_signature:
+            self._stats_signature = stats_signature
+            self._show_stats(read_stats(STATS_PATH))
+
+        if self.predictor is not None:
+            # One stat() of the model pointer; a newly published version
+            # is loaded on a background thread and swapped in
+            self.predictor.check_for_update()
+            self._show_model_status()
+
+        self.after(STATS_POLL_MS, self._poll_dashboard)
+
+    def _refresh_dataset_stats(self):
+        def refresh():
+            from src.dataset import DatasetCache
+            from src.stats_manifest import refresh_dataset_stats
+
+            refresh_dataset_stats()
+            dataset = DatasetCache()
+            counts = dataset.disease_counts().sort_values(ascending=False)
+            return counts, dataset.meta["version"]
+
+        self._run_in_background(
+            refresh,
+            self._show_disease_counts,
+            self._on_dataset_error,
+            executor=self.io_executor,
+        )
+
+    def _show_stats(self, stats):
+        dataset = stats.get("dataset", {})
+        model = stats.get("model", {})
+        cards = self.dashboard_cards
+
+        cards["patients"][1].config(text=f"{dataset['total_patients']:,}" if dataset else "n/a")
+        cards["diseases"][1].config(text=str(dataset["n_diseases"]) if dataset else "n/a")
+        if model:
+            cards["accuracy"][1].config(text=f"{model['accuracy'] * 100:.1f}%")
+            cards["training"][1].config(text=f"{model['training_time_s']:.1f} s")
+            stale = dataset and model.get("dataset_sha1") != dataset.get("sha1")
+            cards["accuracy"][0].config(
+                text="Model Accuracy (trained on older data)" if stale else "Model Accuracy"
+            )
+        else:
+            # No training run recorded yet
+            cards["accuracy"][1].config(text="n/a")
+            cards["training"][1].config(text="n/a")
+
+    def _show_disease_counts(self, result):
+        counts, version = result
+        self.dashboard_placeholder.pack_forget()
+        self.dashboard_chart.pack(pady=10)
+        # Same version as on screen means nothing to redraw
+        self.dashboard_chart.update(counts.index, counts.values, version)
+
+    def _on_dataset_error(self, error):
+        self.dashboard_chart.pack_forget()
+        self.dashboard_placeholder.config(text=f"Dataset not available: {error}")
+        self.dashboard_placeholder.pack(pady=40)
 
     # Predict tab
         # Predict tab
@@ -365,18 +593,29 @@ class MainApp(tk.Tk):
         ).pack(anchor="w", pady=(4, 0))
         self.symptom_text.pack(fill="x", pady=(2, 6))
 
-        predict_btn = tk.Button(
+        # Enabled once the background model load finishes
+        self.predict_btn = tk.Button(
             form_frame,
-            text="Predict Disease",
+            text="Loading model...",
             font=("Segoe UI", 10, "bold"),
             bg="#22b8a7",
             fg="white",
             bd=0,
             relief="flat",
             activebackground="#1fa495",
+            state="disabled",
             command=self._on_predict,
         )
-        predict_btn.pack(pady=(8, 4), fill="x")
+        self.predict_btn.pack(pady=(8, 4), fill="x")
+
+        self.model_status = tk.Label(
+            form_frame,
+            text="Model loading...",
+            font=("Segoe UI", 9),
+            bg="white",
+            fg="#6b7280",
+        )
+        self.model_status.pack(anchor="w")
 
         tk.Label(
             result_frame,
@@ -398,8 +637,8 @@ class MainApp(tk.Tk):
         self.pred_label.pack(anchor="w", pady=(4, 4))
 
     def _on_predict(self):
-        if self.model is None:
-            messagebox.showerror("Model error", "Model not loaded.")
+        if self.predictor is None:
+            messagebox.showinfo("Model loading", "The model is still loading, please wait.")
             return
 
         try:
@@ -416,22 +655,15 @@ class MainApp(tk.Tk):
 
         symptoms_list = [s.strip() for s in symptoms_text.split(",") if s.strip()]
         symptom_count = len(symptoms_list)
+        predictor = self.predictor
 
-        df = pd.DataFrame(
-            [
-                {
-                    "Age": age,
-                    "Gender": gender,
-                    "Symptoms": ", ".join(symptoms_list),
-                    "Symptom_Count": symptom_count,
-                }
-            ]
-        )
+        def predict():
+            from src.history import append_prediction
 
-        try:
-            proba = self.model.predict_proba(df)[0]
-            classes = self.model.classes_
+            proba, classes = predictor.predict(age, gender, symptoms_list)
             top_idx = proba.argsort()[::-1][:3]
+            matcher = predictor.matcher
+            matches = matcher.resolve(symptoms_list) if matcher is not None else []
 
             # log to history
             append_prediction(
@@ -443,26 +675,47 @@ class MainApp(tk.Tk):
                 proba=proba,
                 top_idx=top_idx,
             )
+            return proba, classes, top_idx, matches
+
+        self.predict_btn.config(state="disabled", text="Predicting...")
+        self._run_in_background(predict, self._show_prediction, self._on_predict_error)
+
+    def _show_prediction(self, result):
+        proba, classes, top_idx, matches = result
+        self.predict_btn.config(state="normal", text="Predict Disease")
+
+        lines = []
+        corrected = [
+            f"{token} → {term}" for token, term in matches
+            if term is not None and token.strip().lower() != term
+        ]
+        unknown = [token for token, term in matches if term is None]
+        if corrected:
+            lines.append("Interpreted as: " + ", ".join(corrected))
+        if unknown:
+            lines.append("Not recognised: " + ", ".join(unknown))
+        if corrected or unknown:
+            lines.append("")
+        lines.append(
+            f"Top prediction: {classes[top_idx[0]]} "
+            f"({proba[top_idx[0]]*100:.1f}% probability)"
+        )
 
-            lines = []
-            lines.append(
-                f"Top prediction: {classes[top_idx[0]]} "
-                f"({proba[top_idx[0]]*100:.1f}% probability)"
-            )
+        lines.append("")
+        lines.append("Top 3 diseases:")
+        for i in top_idx:
+            lines.append(f"• {classes[i]} - {proba[i]*100:.1f}%")
 
-            lines.append("")
-            lines.append("Top 3 diseases:")
-            for i in top_idx:
-                lines.append(f"• {classes[i]} - {proba[i]*100:.1f}%")
+        lines.append(
+            "\nNote: This is an educational tool, "
+            "not a medical diagnosis. Always consult a doctor."
+        )
 
-            lines.append(
-                "\nNote: This is an educational tool, "
-                "not a medical diagnosis. Always consult a doctor."
-            )
+        self.pred_label.config(text="\n".join(lines))
 
-            self.pred_label.config(text="\n".join(lines))
-        except Exception as e:
-            messagebox.showerror("Prediction error", f"Could not predict:\n{e}")
+    def _on_predict_error(self, error):
+        self.predict_btn.config(state="normal", text="Predict Disease")
+        messagebox.showerror("Prediction error", f"Could not predict:\n{error}")
 
     # Analytics tab (placeholder for now)
     def _build_analytics_tab(self):
@@ -477,77 +730,351 @@ class MainApp(tk.Tk):
             fg="#1f4f7b",
         ).pack(anchor="w", pady=(4, 8))
 
-        self.analytics_canvas = tk.Label(
+        self.analytics_empty = tk.Label(
             frame,
-            text="No prediction history yet. Make some predictions first.",
+            text=ANALYTICS_EMPTY_TEXT,
             font=("Segoe UI", 11),
             bg="#f4f7fb",
             fg="#6b7280",
             wraplength=800,
             justify="left",
         )
-        self.analytics_canvas.pack(pady=20)
-
-
-    def _refresh_analytics(self):
-        # Show chart of predictions per disease from history
-        if not os.path.exists(HISTORY_PATH):
-            self.analytics_canvas.config(
-                text="No prediction history yet. Make some predictions first.",
-                image="",
-            )
-            return
+        self.analytics_empty.pack(pady=20)
 
-        import matplotlib.pyplot as plt
-        import seaborn as sns
-        import pandas as pd
+        from src.charts import BarChart
 
-        df = pd.read_csv(HISTORY_PATH)
-        if df.empty:
-            self.analytics_canvas.config(
-                text="No prediction history yet. Make some predictions first.",
-                image="",
-            )
-            return
+        self.analytics_chart = BarChart(
+            frame,
+            horizontal=True,
+            title="Top predicted diseases (history)",
+            xlabel="Number of predictions",
+            ylabel="Disease",
+        )
 
-        counts = df["predicted_disease"].value_counts().head(15)
 
-        fig, ax = plt.subplots(figsize=(8, 4))
-        sns.barplot(x=counts.values, y=counts.index, ax=ax, palette="Blues_r")
-        ax.set_xlabel("Number of predictions")
-        ax.set_ylabel("Disease")
-        ax.set_title("Top predicted diseases (history)")
-        fig.tight_layout()
+    def _refresh_analytics(self):
+        # Chart of predictions per disease from the history aggregates,
+        # read on the I/O thread (it may import the legacy CSV and wait for
+        # the history writer); the redraw is skipped when they haven't
+        # changed since the last one
+        def summarize():
+            from src.history import analytics_summary
+
+            return analytics_summary(limit=15)
+
+        self._run_in_background(
+            summarize,
+            self._show_analytics,
+            self._on_analytics_error,
+            executor=self.io_executor,
+        )
 
-        hist_plot_path = os.path.join(EDA_DIR, "history_predictions.png")
-        os.makedirs(EDA_DIR, exist_ok=True)
-        fig.savefig(hist_plot_path, dpi=120)
-        plt.close(fig)
+    def _on_analytics_error(self, error):
+        self.analytics_chart.pack_forget()
+        self.analytics_empty.config(text=f"Could not read history: {error}")
+        self.analytics_empty.pack(pady=20)
+
+    def _show_analytics(self, summary):
+        top = summary["top_diseases"]
+        if not top:
+            self.analytics_chart.pack_forget()
+            self.analytics_empty.config(text=ANALYTICS_EMPTY_TEXT)
+            self.analytics_empty.pack(pady=20)
+            return
 
-        img = Image.open(hist_plot_path)
-        img = img.resize((800, 350), Image.LANCZOS)
-        self.analytics_img = ImageTk.PhotoImage(img)
-        self.analytics_canvas.config(image=self.analytics_img, text="")
+        self.analytics_empty.pack_forget()
+        self.analytics_chart.pack(pady=10)
+        with instrument.span("gui.chart_update"):
+            self.analytics_chart.update(
+                [d for d, _ in top],
+                [n for _, n in top],
+                summary["version"],
+            )
 
 
-    # History tab (placeholder)
+    # History tab
     def _build_history_tab(self):
         frame = tk.Frame(self.history_tab, bg="#f4f7fb")
         frame.pack(fill="both", expand=True, padx=12, pady=12)
 
-        label = tk.Label(
+        filters = tk.Frame(frame, bg="#f4f7fb")
+        filters.pack(fill="x", pady=(0, 8))
+
+        self.history_from_var = tk.StringVar()
+        self.history_to_var = tk.StringVar()
+        self.history_disease_var = tk.StringVar(value="All")
+        self.history_gender_var = tk.StringVar(value="All")
+
+        def field(label, widget):
+            tk.Label(filters, text=label, font=("Segoe UI", 9), bg="#f4f7fb").pack(
+                side="left", padx=(0, 4)
+            )
+            widget.pack(side="left", padx=(0, 12))
+
+        field("From (YYYY-MM-DD)", tk.Entry(filters, textvariable=self.history_from_var, width=12))
+        field("To", tk.Entry(filters, textvariable=self.history_to_var, width=12))
+        self.history_disease_combo = ttk.Combobox(
+            filters,
+            textvariable=self.history_disease_var,
+            values=["All"],
+            state="readonly",
+            width=28,
+        )
+        field("Disease", self.history_disease_combo)
+        field("Gender", ttk.Combobox(
+            filters,
+            textvariable=self.history_gender_var,
+            values=["All", "Male", "Female", "Other"],
+            state="readonly",
+            width=8,
+        ))
+        tk.Button(filters, text="Apply", command=self._history_apply_filters).pack(side="left")
+        tk.Button(filters, text="Reset", command=self._history_reset_filters).pack(
+            side="left", padx=(6, 0)
+        )
+
+        columns = [name for name, _, _ in HISTORY_VIEW_COLUMNS]
+        self.history_tree = ttk.Treeview(
             frame,
-            text="Prediction history table will be added here.",
-            font=("Segoe UI", 11),
-            bg="#f4f7fb",
-            fg="#6b7280",
-            wraplength=800,
-            justify="left",
+            columns=columns,
+            show="headings",
+            height=HISTORY_PAGE_SIZE,
+            selectmode="browse",
+        )
+        for name, heading, width in HISTORY_VIEW_COLUMNS:
+            command = (lambda c=name: self._history_sort(c)) if name != "symptoms" else ""
+            self.history_tree.heading(name, text=heading, command=command)
+            self.history_tree.column(name, width=width, anchor="w")
+        self.history_tree.pack(fill="both", expand=True)
+
+        # A fixed set of rows, refilled for every page; the widget never
+        # holds more than one page no matter how big the history is
+        self.history_items = [
+            self.history_tree.insert("", "end", values=()) for _ in range(HISTORY_PAGE_SIZE)
+        ]
+        for iid in self.history_items:
+            self.history_tree.detach(iid)
+
+        pager = tk.Frame(frame, bg="#f4f7fb")
+        pager.pack(fill="x", pady=(8, 0))
+        self.history_first_btn = tk.Button(pager, text="<< First", command=lambda: self._history_go(0))
+        self.history_prev_btn = tk.Button(
+            pager, text="< Prev", command=lambda: self._history_go(self._history_page - 1)
+        )
+        self.history_next_btn = tk.Button(
+            pager, text="Next >", command=lambda: self._history_go(self._history_page + 1)
         )
-        label.pack(pady=40)
+        for btn in (self.history_first_btn, self.history_prev_btn, self.history_next_btn):
+            btn.pack(side="left", padx=(0, 6))
+        self.history_status = tk.Label(
+            pager, text="", font=("Segoe UI", 9), bg="#f4f7fb", fg="#6b7280"
+        )
+        self.history_status.pack(side="left", padx=12)
+
+        self._history_query = {"sort_by": "timestamp", "descending": True}
+        self._history_token = 0
+        self._history_page = 0
+        self._history_total = None
+        self._history_cursors = [None]
+        self._history_pages = {}
+        self._history_pending = set()
+        self._history_update_headings()
+
+    def _history_reload(self):
+        """Drop cached pages and start over from page 1 of the current query."""
+        from src.history import flush_history
+
+        # Queued records are written first, on the same thread as the reads
+        self.io_executor.submit(flush_history)
+        self._history_token += 1
+        self._history_total = None
+        self._history_cursors = [None]
+        self._history_pages = {}
+        self._history_pending = set()
+        self._history_go(0)
+
+        token = self._history_token
+        query = self._history_filters()
+
+        def count():
+            from src.history import get_store
+
+            store = get_store()
+            return store.count_matching(**query), store.diseases()
+
+        self._run_in_background(
+            count,
+            lambda result: self._history_on_count(token, result),
+            self._history_on_error,
+            executor=self.io_executor,
+        )
+
+    def _history_filters(self):
+        return {k: v for k, v in self._history_query.items() if k not in ("sort_by", "descending")}
+
+    def _history_apply_filters(self):
+        query = {
+            "sort_by": self._history_query["sort_by"],
+            "descending": self._history_query["descending"],
+        }
+        try:
+            if self.history_from_var.get().strip():
+                query["start"] = datetime.strptime(self.history_from_var.get().strip(), "%Y-%m-%d")
+            if self.history_to_var.get().strip():
+                # Inclusive of the whole "to" day
+                query["end"] = datetime.strptime(
+                    self.history_to_var.get().strip(), "%Y-%m-%d"
+                ) + timedelta(days=1)
+        except ValueError:
+            messagebox.showerror("Input error", "Dates must look like 2025-12-31.")
+            return
+        if self.history_disease_var.get() != "All":
+            query["disease"] = self.history_disease_var.get()
+        if self.history_gender_var.get() != "All":
+            query["gender"] = self.history_gender_var.get()
+        self._history_query = query
+        self._history_reload()
+
+    def _history_reset_filters(self):
+        self.history_from_var.set("")
+        self.history_to_var.set("")
+        self.history_disease_var.set("All")
+        self.history_gender_var.set("All")
+        self._history_apply_filters()
+
+    def _history_sort(self, column):
+        if self._history_query["sort_by"] == column:
+            self._history_query["descending"] = not self._history_query["descending"]
+        else:
+            self._history_query["sort_by"] = column
+            self._history_query["descending"] = column in ("timestamp", "top1_prob")
+        self._history_update_headings()
+        self._history_reload()
+
+    def _history_update_headings(self):
+        for name, heading, _ in HISTORY_VIEW_COLUMNS:
+            if name == self._history_query["sort_by"]:
+                heading += " ▼" if self._history_query["descending"] else " ▲"
+            self.history_tree.heading(name, text=heading)
+
+    def _history_go(self, index):
+        if index < 0 or index >= len(self._history_cursors):
+            return
+        self._history_page = index
+        # Only the current page and its neighbours are kept in memory
+        for i in list(self._history_pages):
+            if abs(i - index) > 1:
+                del self._history_pages[i]
+        if index in self._history_pages:
+            self._history_render()
+            self._history_prefetch(index + 1)
+        else:
+            self.history_status.config(text="Loading...")
+            self._history_fetch(index)
+
+    def _history_fetch(self, index):
+        if index in self._history_pending or index in self._history_pages:
+            return
+        if index >= len(self._history_cursors):
+            return
+        self._history_pending.add(index)
+        token = self._history_token
+        query = dict(self._history_query)
+        after = self._history_cursors[index]
+        columns = [name for name, _, _ in HISTORY_VIEW_COLUMNS]
+
+        def fetch():
+            from src.history import get_store
+
+            # One extra row tells us whether there is a next page
+            rows, _ = get_store().page(
+                columns=columns, after=after, limit=HISTORY_PAGE_SIZE + 1, **query
+            )
+            return rows
+
+        self._run_in_background(
+            fetch,
+            lambda rows: self._history_on_page(token, index, rows),
+            self._history_on_error,
+            executor=self.io_executor,
+        )
+
+    def _history_prefetch(self, index):
+        # Read the next page in the background so "Next" is instant
+        if index < len(self._history_cursors):
+            self._history_fetch(index)
+
+    def _history_on_page(self, token, index, rows):
+        if token != self._history_token:
+            return  # filters or sort changed while this page was loading
+        self._history_pending.discard(index)
+        has_next = len(rows) > HISTORY_PAGE_SIZE
+        rows = rows[:HISTORY_PAGE_SIZE]
+        self._history_pages[index] = rows
+        if has_next and len(self._history_cursors) == index + 1:
+            sort_pos = 1 + [name for name, _, _ in HISTORY_VIEW_COLUMNS].index(
+                self._history_query["sort_by"]
+            )
+            self._history_cursors.append((rows[-1][sort_pos], rows[-1][0]))
+        if index == self._history_page:
+            self._history_render()
+            self._history_prefetch(index + 1)
+
+    def _history_on_count(self, token, result):
+        if token != self._history_token:
+            return
+        self._history_total, diseases = result
+        self.history_disease_combo.config(values=["All"] + diseases)
+        self._history_update_status()
+
+    def _history_on_error(self, error):
+        self._history_pending = set()
+        self.history_status.config(text=f"Could not read history: {error}")
+
+    def _history_render(self):
+        rows = self._history_pages.get(self._history_page, [])
+        for pos, iid in enumerate(self.history_items):
+            if pos < len(rows):
+                _, timestamp, age, gender, symptoms, disease, prob = rows[pos]
+                age = f"{age:.0f}" if isinstance(age, (int, float)) else age
+                prob = f"{prob * 100:.1f}%" if isinstance(prob, (int, float)) else prob
+                self.history_tree.item(
+                    iid, values=(timestamp, age, gender, symptoms, disease, prob)
+                )
+                self.history_tree.move(iid, "", pos)
+            else:
+                self.history_tree.detach(iid)
+        self._history_update_status()
+
+    def _history_update_status(self):
+        page = self._history_page
+        has_next = page + 1 < len(self._history_cursors)
+        self.history_prev_btn.config(state="normal" if page > 0 else "disabled")
+        self.history_first_btn.config(state="normal" if page > 0 else "disabled")
+        self.history_next_btn.config(state="normal" if has_next else "disabled")
+        if self._history_total is None:
+            total = "counting..."
+        else:
+            n_pages = max(1, -(-self._history_total // HISTORY_PAGE_SIZE))
+            total = f"of {n_pages:,} ({self._history_total:,} predictions)"
+        self.history_status.config(text=f"Page {page + 1:,} {total}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SymptoCare desktop app.")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print import and startup phase timings",
+    )
+    instrument.add_arguments(parser)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    PROFILE.enabled = args.profile_startup
+    instrument.configure(args)
     login = LoginWindow()
     login.mainloop()
 
@@ -1,48 +1,241 @@
+import atexit
 import os
-import csv
+import queue
+import threading
+import time
 from datetime import datetime
 
+from src import instrument
+from src.history_analytics import AGGREGATES_PATH, HistoryAggregates
+from src.history_store import HISTORY_DB_PATH, HistoryStore
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Legacy CSV history, imported into the SQLite store on first use
 HISTORY_PATH = os.path.join(BASE_DIR, "data", "prediction_history.csv")
 
+_store = None
+_writer = None
+_aggregates = None
+_store_lock = threading.Lock()
+_aggregates_lock = threading.Lock()
+
+
+def get_store():
+    """Shared HistoryStore for this process, created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore(HISTORY_DB_PATH)
+            if os.path.exists(HISTORY_PATH):
+                _store.import_csv(HISTORY_PATH)
+        return _store
+
+
+class HistoryWriter:
+    """
+    Queue history records in memory and write them to the store in batches
+    from a background thread, so callers never wait on disk I/O. A batch is
+    written once batch_size records are queued or flush_interval seconds
+    have passed since the first one; close() writes whatever is left.
+    At most max_queued records wait in memory; append() blocks beyond that.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store, batch_size=256, flush_interval=0.5, on_write=None,
+                 max_queued=10_000):
+        self.store = store
+        self.on_write = on_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=max_queued)
+        # Held while checking _closed and queuing, so nothing can be queued
+        # behind the stop marker
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="history-writer", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, record):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HistoryWriter is closed")
+            self._queue.put(record)
+
+    def append_many(self, records):
+        for record in records:
+            self.append(record)
+
+    def flush(self):
+        """Block until every record queued so far has been written."""
+        self._queue.join()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _write(self, batch):
+        try:
+            try:
+                with instrument.span("history.append"):
+                    self.store.append_many(batch)
+            except Exception as e:
+                # Keep the writer alive; a failed batch must not stop later ones
+                self.errors += len(batch)
+                print(f"History write failed ({len(batch)} records): {e}")
+                return
+            instrument.count("history.records", len(batch))
+            self.written += len(batch)
+            if self.on_write is not None:
+                try:
+                    self.on_write(batch)
+                except Exception as e:
+                    # The records are stored; only the callback failed
+                    print(f"History on_write callback failed: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                self._drain()
+                return
+            batch = [item]
+            stop = False
+            wait_until = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = wait_until - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                self._queue.task_done()
+                self._drain()
+                return
+
+    def _drain(self):
+        # Anything still queued after the stop marker is written too, so a
+        # flush() waiting on it can't hang
+        rest = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                self._queue.task_done()
+            else:
+                rest.append(item)
+        for i in range(0, len(rest), self.batch_size):
+            self._write(rest[i:i + self.batch_size])
 
-def ensure_history_file():
-    os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
-    if not os.path.exists(HISTORY_PATH):
-        with open(HISTORY_PATH, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "timestamp",
-                "age",
-                "gender",
-                "symptoms",
-                "symptom_count",
-                "predicted_disease",
-                "top1_prob",
-                "top2_disease",
-                "top2_prob",
-                "top3_disease",
-                "top3_prob",
-            ])
+
+def get_writer():
+    """Shared background HistoryWriter, flushed and closed at exit."""
+    global _writer
+    store = get_store()
+    with _store_lock:
+        if _writer is None:
+            _writer = HistoryWriter(store, on_write=lambda batch: refresh_aggregates())
+            atexit.register(_writer.close)
+        return _writer
+
+
+def refresh_aggregates(rebuild=False):
+    """
+    Bring the running history aggregates up to date (only rows appended
+    since the last checkpoint are read) and return them. The background
+    writer calls this after every batch it writes.
+    """
+    global _aggregates
+    store = get_store()
+    with _aggregates_lock:
+        if _aggregates is None:
+            _aggregates = HistoryAggregates.load(AGGREGATES_PATH)
+        with instrument.span("analytics.refresh"):
+            _aggregates.refresh(store, rebuild=rebuild)
+        return _aggregates
+
+
+def analytics_summary(limit=15):
+    """Consistent snapshot of the aggregates for display."""
+    aggs = refresh_aggregates()
+    with _aggregates_lock:
+        return {
+            "version": aggs.version,
+            "n_rows": aggs.n_rows,
+            "mean_top1_prob": aggs.mean_top1_prob,
+            "top_diseases": aggs.top_diseases(limit),
+            "top_symptoms": aggs.top_symptoms(limit),
+            "day_counts": sorted(aggs.day_counts.items()),
+        }
+
+
+def make_record(age, gender, symptoms, symptom_count,
+                classes, proba, top_idx):
+    def top(rank):
+        if len(top_idx) > rank:
+            return classes[top_idx[rank]], float(proba[top_idx[rank]])
+        return "", 0.0
+
+    top1, top1_prob = top(0)
+    top2, top2_prob = top(1)
+    top3, top3_prob = top(2)
+    return {
+        "timestamp": datetime.now(),
+        "age": age,
+        "gender": gender,
+        "symptoms": symptoms,
+        "symptom_count": symptom_count,
+        "predicted_disease": top1,
+        "top1_prob": top1_prob,
+        "top2_disease": top2,
+        "top2_prob": top2_prob,
+        "top3_disease": top3,
+        "top3_prob": top3_prob,
+    }
 
 
 def append_prediction(age, gender, symptoms, symptom_count,
                       classes, proba, top_idx):
-    ensure_history_file()
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    row = [
-        ts,
-        age,
-        gender,
-        symptoms,
-        symptom_count,
-        classes[top_idx[0]],
-        float(proba[top_idx[0]]),
-        classes[top_idx[1]],
-        float(proba[top_idx[1]]),
-        classes[top_idx[2]],
-        float(proba[top_idx[2]]),
-    ]
-    with open(HISTORY_PATH, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(row)
+    record = make_record(age, gender, symptoms, symptom_count,
+                         classes, proba, top_idx)
+    get_writer().append(record)
+
+
+def append_predictions(records):
+    """Queue many make_record() dicts at once, e.g. from batch scoring."""
+    get_writer().append_many(records)
+
+
+def flush_history():
+    if _writer is not None:
+        _writer.flush()
+
+
+def close_history():
+    """Write out queued records and stop the background writer."""
+    global _writer
+    with _store_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
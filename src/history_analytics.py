@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import tempfile
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGGREGATES_PATH = os.path.join(BASE_DIR, "data", "history_aggregates.json")
+
+_COLUMNS = ["timestamp", "symptoms", "predicted_disease", "top1_prob"]
+
+
+class HistoryAggregates:
+    """
+    Running aggregates over the prediction history: per-disease and per-day
+    counts, mean top-1 probability and symptom frequencies.
+
+    last_id is a checkpoint into the store's id column, so refresh() only
+    reads rows appended since the previous refresh. The snapshot on disk
+    remembers which store (and which clear() generation of it) the
+    checkpoint belongs to, and is rebuilt when that no longer matches.
+    version increases whenever the aggregates change.
+    """
+
+    def __init__(self, path=AGGREGATES_PATH):
+        self.path = path
+        self._reset()
+        self.version = 0
+
+    def _reset(self):
+        self.disease_counts = Counter()
+        self.day_counts = Counter()
+        self.symptom_counts = Counter()
+        self.n_rows = 0
+        self.top1_sum = 0.0
+        self.last_id = 0
+        self.store_id = None
+        self.generation = None
+
+    @property
+    def mean_top1_prob(self):
+        return self.top1_sum / self.n_rows if self.n_rows else 0.0
+
+    def top_diseases(self, limit=15):
+        return self.disease_counts.most_common(limit)
+
+    def top_symptoms(self, limit=15):
+        return self.symptom_counts.most_common(limit)
+
+    def add(self, timestamp, symptoms, predicted_disease, top1_prob):
+        self.n_rows += 1
+        self.disease_counts[predicted_disease] += 1
+        self.day_counts[str(timestamp)[:10]] += 1
+        self.top1_sum += float(top1_prob or 0.0)
+        for s in str(symptoms or "").split(","):
+            s = s.strip().lower()
+            if s:
+                self.symptom_counts[s] += 1
+
+    def refresh(self, store, rebuild=False):
+        """
+        Fold rows added to store since the checkpoint into the aggregates
+        and save the snapshot. Returns the number of new rows.
+        """
+        store_id = store.store_id()
+        generation = store.generation()
+        if rebuild or self.store_id != store_id or self.generation != generation:
+            self._reset()
+            self.store_id = store_id
+            self.generation = generation
+            self.version += 1
+
+        n_new = 0
+        for rows in store.iter_since(self.last_id, columns=_COLUMNS):
+            for row_id, timestamp, symptoms, disease, top1_prob in rows:
+                self.add(timestamp, symptoms, disease, top1_prob)
+            self.last_id = rows[-1][0]
+            n_new += len(rows)
+
+        if n_new or rebuild:
+            self.version += 1
+            self.save()
+        return n_new
+
+    def to_dict(self):
+        return {
+            "store_id": self.store_id,
+            "generation": self.generation,
+            "last_id": self.last_id,
+            "n_rows": self.n_rows,
+            "top1_sum": self.top1_sum,
+            "disease_counts": dict(self.disease_counts),
+            "day_counts": dict(self.day_counts),
+            "symptom_counts": dict(self.symptom_counts),
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        # mkstemp creates it owner-only; other users' processes read it too
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self.path)
+
+    @classmethod
+    def load(cls, path=AGGREGATES_PATH):
+        aggs = cls(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return aggs
+        aggs.store_id = data.get("store_id")
+        aggs.generation = data.get("generation")
+        aggs.last_id = data.get("last_id", 0)
+        aggs.n_rows = data.get("n_rows", 0)
+        aggs.top1_sum = data.get("top1_sum", 0.0)
+        aggs.disease_counts = Counter(data.get("disease_counts", {}))
+        aggs.day_counts = Counter(data.get("day_counts", {}))
+        aggs.symptom_counts = Counter(data.get("symptom_counts", {}))
+        aggs.version = 1
+        return aggs
+
+
+def main():
+    from src.history import get_store
+
+    parser = argparse.ArgumentParser(description="Update the prediction history aggregates.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute from scratch")
+    args = parser.parse_args()
+
+    aggs = HistoryAggregates.load()
+    n_new = aggs.refresh(get_store(), rebuild=args.rebuild)
+    print(f"Processed {n_new} new rows ({aggs.n_rows} total, checkpoint id {aggs.last_id})")
+    print(f"Mean top-1 probability: {aggs.mean_top1_prob:.3f}")
+    for disease, n in aggs.top_diseases(5):
+        print(f"  {disease}: {n}")
+
+
+if __name__ == "__main__":
+    main()
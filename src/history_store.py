@@ -0,0 +1,275 @@
+import csv
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_DB_PATH = os.path.join(BASE_DIR, "data", "prediction_history.db")
+
+HISTORY_COLUMNS = [
+    "timestamp",
+    "age",
+    "gender",
+    "symptoms",
+    "symptom_count",
+    "predicted_disease",
+    "top1_prob",
+    "top2_disease",
+    "top2_prob",
+    "top3_disease",
+    "top3_prob",
+]
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns the history table can be ordered by; each has an index, and ties
+# are broken by id so every row has a unique position
+SORTABLE_COLUMNS = ("timestamp", "age", "gender", "predicted_disease", "top1_prob")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    age REAL,
+    gender TEXT,
+    symptoms TEXT,
+    symptom_count INTEGER,
+    predicted_disease TEXT,
+    top1_prob REAL,
+    top2_disease TEXT,
+    top2_prob REAL,
+    top3_disease TEXT,
+    top3_prob REAL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_age ON predictions (age);
+CREATE INDEX IF NOT EXISTS idx_predictions_gender ON predictions (gender);
+CREATE INDEX IF NOT EXISTS idx_predictions_top1_prob ON predictions (top1_prob);
+CREATE INDEX IF NOT EXISTS idx_predictions_disease ON predictions (predicted_disease);
+-- Disease filter combined with the other sort orders
+CREATE INDEX IF NOT EXISTS idx_predictions_disease_time ON predictions (predicted_disease, timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_disease_age ON predictions (predicted_disease, age);
+CREATE INDEX IF NOT EXISTS idx_predictions_disease_top1 ON predictions (predicted_disease, top1_prob);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_INSERT_SQL = (
+    f"INSERT INTO predictions ({', '.join(HISTORY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+)
+
+
+def normalize_timestamp(value):
+    """
+    Store every timestamp as "YYYY-MM-DD HH:MM:SS" so text order is time
+    order. Accepts both formats found in the old CSV ("2025-12-03 15:44:30"
+    and the ISO "2025-12-03T15:46:33") as well as datetime objects.
+    """
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return datetime.fromisoformat(str(value).strip()).strftime(TIMESTAMP_FORMAT)
+
+
+class HistoryStore:
+    """
+    Prediction history in SQLite (WAL mode) with indexes on timestamp and
+    predicted_disease. One connection is kept open for the lifetime of the
+    store and shared between threads behind a lock.
+    """
+
+    def __init__(self, db_path=HISTORY_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        with self._conn:
+            # Identifies this database file in checkpoints kept elsewhere
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('store_id', ?)",
+                (uuid.uuid4().hex,),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row(record):
+        row = [record.get(col) for col in HISTORY_COLUMNS]
+        row[0] = normalize_timestamp(row[0] or datetime.now())
+        return row
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        rows = [self._row(r) for r in records]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(_INSERT_SQL, rows)
+
+    def import_csv(self, csv_path, force=False):
+        """
+        Copy an existing prediction_history.csv into the store. Each file
+        is imported once (tracked in the meta table) unless force is True.
+        Returns the number of rows imported.
+        """
+        key = f"imported:{os.path.abspath(csv_path)}"
+        if not force and self.get_meta(key) is not None:
+            return 0
+        rows = []
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for rec in csv.DictReader(f):
+                try:
+                    rows.append(self._row(rec))
+                except ValueError:
+                    continue  # unparseable timestamp
+        marked = (key, normalize_timestamp(datetime.now()))
+        with self._lock, self._conn:
+            # Claim the file and insert in one write transaction, so of two
+            # processes importing at once only the first copies the rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            if force:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", marked)
+            elif self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", marked
+            ).rowcount == 0:
+                return 0
+            self._conn.executemany(_INSERT_SQL, rows)
+        return len(rows)
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _time_filter(start=None, end=None):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(normalize_timestamp(start))
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(normalize_timestamp(end))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    @classmethod
+    def _filters(cls, start=None, end=None, disease=None, gender=None):
+        where, params = cls._time_filter(start, end)
+        clauses = [where[len("WHERE "):]] if where else []
+        if disease:
+            clauses.append("predicted_disease = ?")
+            params.append(disease)
+        if gender:
+            # Unary + keeps SQLite from picking the low-selectivity gender
+            # index over the index that matches the sort order
+            clauses.append("+gender = ?")
+            params.append(gender)
+        return clauses, params
+
+    def count_matching(self, start=None, end=None, disease=None, gender=None):
+        clauses, params = self._filters(start, end, disease, gender)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(f"SELECT COUNT(*) FROM predictions {where}", params)[0][0]
+
+    def page(self, columns=HISTORY_COLUMNS, sort_by="timestamp", descending=True,
+             after=None, limit=50, start=None, end=None, disease=None, gender=None):
+        """
+        One page of (id, *columns) rows matching the filters, ordered by
+        sort_by and then id. Returns (rows, next_after), where next_after is
+        passed as after to get the following page. Pages are found with a
+        keyset condition on (sort_by, id) rather than OFFSET, so page N
+        costs the same as page 1 no matter how large the table is.
+        """
+        if sort_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"cannot sort history by {sort_by!r}")
+        clauses, params = self._filters(start, end, disease, gender)
+        if after is not None:
+            op = "<" if descending else ">"
+            clauses.append(f"({sort_by}, id) {op} (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        rows = self._query(
+            f"SELECT id, {sort_by}, {', '.join(columns)} FROM predictions {where} "
+            f"ORDER BY {sort_by} {direction}, id {direction} LIMIT ?",
+            params + [limit],
+        )
+        next_after = (rows[-1][1], rows[-1][0]) if rows else None
+        return [(row[0],) + row[2:] for row in rows], next_after
+
+    def diseases(self):
+        """Distinct predicted diseases, read from the disease index."""
+        return [r[0] for r in self._query(
+            "SELECT DISTINCT predicted_disease FROM predictions "
+            "WHERE predicted_disease IS NOT NULL ORDER BY predicted_disease"
+        )]
+
+    def count(self, start=None, end=None):
+        where, params = self._time_filter(start, end)
+        return self._query(f"SELECT COUNT(*) FROM predictions {where}", params)[0][0]
+
+    def top_diseases(self, limit=15, start=None, end=None):
+        """[(disease, count), ...] most predicted first."""
+        where, params = self._time_filter(start, end)
+        return self._query(
+            f"SELECT predicted_disease, COUNT(*) AS n FROM predictions {where} "
+            "GROUP BY predicted_disease ORDER BY n DESC, predicted_disease LIMIT ?",
+            params + [limit],
+        )
+
+    def counts_by_day(self, start=None, end=None):
+        """[(YYYY-MM-DD, count), ...] in date order."""
+        where, params = self._time_filter(start, end)
+        return self._query(
+            f"SELECT substr(timestamp, 1, 10) AS day, COUNT(*) FROM predictions {where} "
+            "GROUP BY day ORDER BY day",
+            params,
+        )
+
+    def max_id(self):
+        return self._query("SELECT COALESCE(MAX(id), 0) FROM predictions")[0][0]
+
+    def store_id(self):
+        return self.get_meta("store_id")
+
+    def generation(self):
+        """Bumped by clear(), so id checkpoints taken before it are stale."""
+        return int(self.get_meta("generation") or 0)
+
+    def iter_since(self, last_id, columns=HISTORY_COLUMNS, batch_size=5000):
+        """Yield (id, *columns) rows with id > last_id in id order, in batches."""
+        cols = ", ".join(columns)
+        while True:
+            rows = self._query(
+                f"SELECT id, {cols} FROM predictions WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def clear(self):
+        generation = self.generation() + 1
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM predictions")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)",
+                (str(generation),),
+            )
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+FEATURE_COLUMNS = ["Age", "Gender", "Symptoms", "Symptom_Count"]
+
+
+def split_symptoms(text):
+    """Split a free-text "a, b, c" symptom string into stripped, non-empty parts."""
+    return [s.strip() for s in str(text).split(",") if s.strip()]
+
+
+def build_input_frame(records):
+    """
+    Build the model's input DataFrame from dicts with age, gender and
+    symptoms (either a comma-separated string or a list of strings).
+    """
+    rows = []
+    for rec in records:
+        symptoms = rec["symptoms"]
+        if isinstance(symptoms, str):
+            symptoms = split_symptoms(symptoms)
+        else:
+            symptoms = [str(s).strip() for s in symptoms if str(s).strip()]
+        rows.append({
+            "Age": float(rec["age"]),
+            "Gender": rec["gender"],
+            "Symptoms": ", ".join(symptoms),
+            "Symptom_Count": len(symptoms),
+        })
+    return pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+
+
+def prepare_features(df):
+    """Select the model's input columns, deriving Symptom_Count if absent."""
+    df = df.copy()
+    if "Symptom_Count" not in df.columns:
+        df["Symptom_Count"] = df["Symptoms"].fillna("").map(lambda t: len(split_symptoms(t)))
+    return df[FEATURE_COLUMNS]
+
+
+def top_k_indices(proba, k=3):
+    """
+    Column indices of the k largest probabilities per row, best first.
+    Same ordering as proba.argsort()[::-1][:k] on a single row.
+    """
+    proba = np.atleast_2d(proba)
+    return np.argsort(proba, axis=1)[:, ::-1][:, :k]
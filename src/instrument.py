@@ -0,0 +1,315 @@
+"""
+Named timing spans and counters for the hot paths.
+
+Off by default: span() then returns a shared no-op context manager and
+count() returns immediately, so the calls can stay in the code. Turn it
+on with SYMPTOCARE_INSTRUMENT=1 (or =path/to/output.json) or with the
+--instrument flag of the entry points. At exit, per-span histograms and
+counters are written as JSON.
+
+One span can also be profiled: SYMPTOCARE_PROFILE_SPAN=transform (or
+--profile-span) writes a cProfile .prof of every call of that span next
+to the JSON; with SYMPTOCARE_PROFILE_MODE=tracemalloc it records the peak
+allocation of each call and writes a tracemalloc snapshot instead.
+
+Pool workers exit without running atexit handlers, and spawned ones
+don't inherit the settings: pass worker_config() to the pool initializer,
+call init_worker() there and dump() at the end of each task. Each worker
+writes its own -<pid> file next to the parent's.
+"""
+import atexit
+import bisect
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, "reports", "instrumentation.json")
+
+# Histogram bucket upper bounds in ms: 0.01 ms, 0.02 ms, ... ~84 s
+BUCKETS_MS = [0.01 * 2 ** i for i in range(24)]
+
+_enabled = False
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+_config = {"output": DEFAULT_OUTPUT, "profile_span": None, "profile_mode": "cprofile"}
+_profiler = None
+_snapshot = None
+_atexit_registered = False
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.peak_alloc = 0
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th quantile
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + [self.max], self.buckets):
+            seen += n
+            if seen >= target and n:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        labels = [f"<={b:g}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]:g}"]
+        out = {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 4) if self.count else 0.0,
+            "min_ms": round(self.min, 4) if self.count else 0.0,
+            "max_ms": round(self.max, 4),
+            "p50_ms": round(self.percentile(0.50), 4),
+            "p95_ms": round(self.percentile(0.95), 4),
+            "p99_ms": round(self.percentile(0.99), 4),
+            "histogram_ms": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+        if self.peak_alloc:
+            out["peak_alloc_bytes"] = self.peak_alloc
+        return out
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start", "profiled")
+
+    def __init__(self, name):
+        self.name = name
+        self.profiled = name == _config["profile_span"]
+
+    def __enter__(self):
+        if self.profiled:
+            _start_profile()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1000.0
+        peak = _stop_profile() if self.profiled else 0
+        with _lock:
+            stats = _spans.get(self.name)
+            if stats is None:
+                stats = _spans[self.name] = SpanStats()
+            stats.add(ms)
+            stats.peak_alloc = max(stats.peak_alloc, peak)
+        return False
+
+
+def span(name):
+    """Context manager timing the block as one call of span `name`."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def count(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def record(name, seconds):
+    """Add a duration measured elsewhere (e.g. in a worker process)."""
+    if not _enabled:
+        return
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = SpanStats()
+        stats.add(seconds * 1000.0)
+
+
+def _start_profile():
+    global _profiler
+    if _config["profile_mode"] == "tracemalloc":
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    else:
+        import cProfile
+
+        if _profiler is None:
+            _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def _stop_profile():
+    global _snapshot
+    if _config["profile_mode"] == "tracemalloc":
+        import tracemalloc
+
+        peak = tracemalloc.get_traced_memory()[1]
+        _snapshot = tracemalloc.take_snapshot()
+        return peak
+    _profiler.disable()
+    return 0
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(output=None, profile_span=None, profile_mode=None):
+    global _enabled, _atexit_registered
+    if output:
+        _config["output"] = output
+    if profile_span:
+        _config["profile_span"] = profile_span
+    if profile_mode:
+        if profile_mode not in ("cprofile", "tracemalloc"):
+            raise ValueError(f"unknown profile mode {profile_mode!r}")
+        _config["profile_mode"] = profile_mode
+    _enabled = True
+    if not _atexit_registered:
+        atexit.register(dump)
+        _atexit_registered = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    global _profiler, _snapshot
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+    _profiler = None
+    _snapshot = None
+
+
+def snapshot():
+    with _lock:
+        return {
+            "spans": {name: s.to_dict() for name, s in sorted(_spans.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def worker_config():
+    """The current settings, to hand to a worker process's init_worker()."""
+    return dict(_config, enabled=_enabled)
+
+
+def init_worker(config):
+    """
+    Apply the parent's worker_config() in a pool worker, dropping any
+    spans and counters inherited through fork so they aren't counted twice.
+    """
+    reset()
+    if config.get("enabled"):
+        enable(config["output"], config["profile_span"], config["profile_mode"])
+    else:
+        disable()
+
+
+def _output_path():
+    path = _config["output"]
+    if multiprocessing.parent_process() is not None:
+        # Worker processes inherit the setting; keep them from overwriting
+        # the parent's file
+        root, ext = os.path.splitext(path)
+        path = f"{root}-{os.getpid()}{ext}"
+    return path
+
+
+def dump(path=None):
+    """Write the span and counter summary (plus any profile) to JSON."""
+    if not _enabled and not _spans and not _counters:
+        return None
+    path = path or _output_path()
+    data = snapshot()
+    data["pid"] = os.getpid()
+    data["written_at"] = datetime.now().isoformat(timespec="seconds")
+
+    root = os.path.splitext(path)[0]
+    if _profiler is not None:
+        _profiler.dump_stats(root + ".prof")
+        data["profile"] = root + ".prof"
+    if _snapshot is not None:
+        _snapshot.dump(root + ".tracemalloc")
+        data["tracemalloc_snapshot"] = root + ".tracemalloc"
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    # mkstemp creates it owner-only; other users' processes read it too
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+    return path
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--instrument",
+        nargs="?",
+        const=DEFAULT_OUTPUT,
+        default=None,
+        metavar="PATH",
+        help="record span timings and write them as JSON at exit",
+    )
+    parser.add_argument(
+        "--profile-span",
+        default=None,
+        metavar="NAME",
+        help="also profile every call of this span (implies --instrument)",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=["cprofile", "tracemalloc"],
+        default=None,
+        help="how --profile-span profiles (default: cprofile)",
+    )
+
+
+def configure(args=None):
+    """Enable from parsed --instrument/--profile-span args or the environment."""
+    env = os.environ.get("SYMPTOCARE_INSTRUMENT", "")
+    output = getattr(args, "instrument", None)
+    profile_span = getattr(args, "profile_span", None) or os.environ.get("SYMPTOCARE_PROFILE_SPAN")
+    profile_mode = getattr(args, "profile_mode", None) or os.environ.get("SYMPTOCARE_PROFILE_MODE")
+    if env and env.lower() not in ("0", "false", "no"):
+        output = output or (env if env.lower() not in ("1", "true", "yes") else None)
+    elif output is None and not profile_span:
+        return
+    enable(output, profile_span, profile_mode)
+
+
+configure()
@@ -0,0 +1,266 @@
+"""
+Versioned model registry.
+
+    models/registry/
+        CURRENT                     name of the active version
+        versions/<version>/
+            model.joblib            the fitted Pipeline
+            flat/                   memory-mappable export (forests only)
+            metrics.txt             the training report
+            info.json               accuracy, dataset hash, timings, ...
+
+A version is assembled in a hidden temporary directory and renamed into
+versions/ in one step, so loaders never see a partial one; CURRENT is
+replaced atomically the same way. Loaders poll CURRENT's mtime (see
+CachedPredictor) and swap to the new version in the background.
+
+    python -m src.model_registry list
+    python -m src.model_registry use 20250101-120000
+    python -m src.model_registry import models/disease_model.joblib
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_DIR = os.path.join(BASE_DIR, "models", "registry")
+CURRENT_NAME = "CURRENT"
+PICKLE_NAME = "model.joblib"
+FLAT_NAME = "flat"
+INFO_NAME = "info.json"
+METRICS_NAME = "metrics.txt"
+# Versions kept by publish(), besides the current one
+KEEP_VERSIONS = 3
+# Versions younger than this are never pruned: a batch run may have
+# resolved one that its workers haven't loaded yet
+PRUNE_GRACE_S = 3600
+
+
+def is_registry(path):
+    return os.path.isfile(os.path.join(path, CURRENT_NAME))
+
+
+def resolve_model_path(path):
+    """The current version's model file if path is a registry, else path."""
+    return ModelRegistry(path).model_path() if is_registry(path) else path
+
+
+def _version_key(name):
+    # "20250101-120000-10" sorts after "20250101-120000-2"
+    base, _, n = name.partition("-")[2].partition("-")
+    return name.split("-")[0], base, int(n) if n.isdigit() else 1
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    # mkstemp creates it owner-only; other users' loaders read it too
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def link_file(src, dst):
+    """
+    Atomically make dst a hard link to src (a copy where links aren't
+    supported), so readers of dst never see a partly written file.
+    """
+    tmp = f"{dst}.tmp-{os.getpid()}"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        self.pointer_path = os.path.join(root, CURRENT_NAME)
+
+    def versions(self):
+        """Published versions, oldest first."""
+        try:
+            names = os.listdir(self.versions_dir)
+        except OSError:
+            return []
+        return sorted((n for n in names if not n.startswith(".")), key=_version_key)
+
+    def current(self):
+        try:
+            with open(self.pointer_path, encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def info(self, version):
+        with open(os.path.join(self.version_dir(version), INFO_NAME), encoding="utf-8") as f:
+            return json.load(f)
+
+    def pickle_path(self, version):
+        return os.path.join(self.version_dir(version), PICKLE_NAME)
+
+    def model_path(self, version=None):
+        """What load_model should open: the flat export if there is one."""
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"no current model version in {self.root}")
+        flat = os.path.join(self.version_dir(version), FLAT_NAME)
+        return flat if os.path.isdir(flat) else self.pickle_path(version)
+
+    def _new_version_name(self):
+        name = datetime.now().strftime("%Y%m%d-%H%M%S")
+        existing = set(self.versions())
+        version, n = name, 1
+        while version in existing:
+            n += 1
+            version = f"{name}-{n}"
+        return version
+
+    def publish(self, model, info=None, flat=False, metrics_path=None,
+                make_current=True, keep=KEEP_VERSIONS, flat_options=None):
+        """
+        Write model as a new version and (by default) make it current.
+        flat=True also writes the memory-mappable forest export, built with
+        flat_options (compact, value_dtype, max_depth, min_samples_leaf;
+        see CompiledModel.from_pipeline). Returns the version name.
+        """
+        import joblib
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.versions_dir, prefix=".tmp-")
+        try:
+            os.chmod(staging, 0o755)
+            joblib.dump(model, os.path.join(staging, PICKLE_NAME))
+            if flat:
+                from src.forest_engine import CompiledModel
+
+                CompiledModel.from_pipeline(model, **(flat_options or {})).save(
+                    os.path.join(staging, FLAT_NAME)
+                )
+            if metrics_path and os.path.exists(metrics_path):
+                shutil.copy2(metrics_path, os.path.join(staging, METRICS_NAME))
+            version = self._new_version_name()
+            meta = dict(info or {}, version=version,
+                        created_at=datetime.now().isoformat(timespec="seconds"))
+            if flat and flat_options:
+                meta["flat_options"] = flat_options
+            with open(os.path.join(staging, INFO_NAME), "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+            os.rename(staging, self.version_dir(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if make_current:
+            self.set_current(version)
+        if keep is not None:
+            self.prune(keep)
+        return version
+
+    def save_metrics(self, version, metrics_path):
+        """Replace version's copy of metrics.txt with metrics_path."""
+        with open(metrics_path, encoding="utf-8") as f:
+            _write_atomic(os.path.join(self.version_dir(version), METRICS_NAME), f.read())
+
+    def set_current(self, version):
+        if version not in self.versions():
+            raise ValueError(f"unknown model version {version!r}")
+        _write_atomic(self.pointer_path, version + "\n")
+
+    def created_at(self, version):
+        """When version was published (info.json, else the directory's mtime)."""
+        try:
+            return datetime.fromisoformat(self.info(version)["created_at"]).timestamp()
+        except (OSError, ValueError, KeyError):
+            try:
+                return os.path.getmtime(self.version_dir(version))
+            except OSError:
+                return 0.0
+
+    def prune(self, keep=KEEP_VERSIONS, grace=PRUNE_GRACE_S):
+        """
+        Delete all but the newest `keep` versions (by publish time), never
+        the current one nor any published less than `grace` seconds ago.
+        Processes that still have a deleted version's arrays mapped keep
+        reading them until they swap.
+        """
+        current = self.current()
+        old = [v for v in self.versions() if v != current]
+        created = {v: self.created_at(v) for v in old}
+        old.sort(key=lambda v: (created[v], _version_key(v)))
+        cutoff = datetime.now().timestamp() - grace
+        for version in old[:max(0, len(old) - keep)]:
+            if created[version] < cutoff:
+                shutil.rmtree(self.version_dir(version), ignore_errors=True)
+
+
+def flattenable(model):
+    """True if model is a vocabulary-feature forest the flat engine can export."""
+    from src.preprocessing import FullFeatureTransformer
+
+    steps = getattr(model, "named_steps", {})
+    return (isinstance(steps.get("features"), FullFeatureTransformer)
+            and hasattr(steps.get("clf"), "estimators_"))
+
+
+def _print_versions(registry):
+    current = registry.current()
+    versions = registry.versions()
+    if not versions:
+        print(f"No versions in {registry.root}")
+    for version in versions:
+        try:
+            info = registry.info(version)
+        except (OSError, ValueError):
+            info = {}
+        accuracy = info.get("accuracy")
+        print(f"{'*' if version == current else ' '} {version:<18} "
+              f"{info.get('model', '?'):<14} "
+              f"acc {accuracy if accuracy is not None else '?':<8}  "
+              f"data {str(info.get('dataset_sha1', '?'))[:10]}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    parser.add_argument("--root", default=REGISTRY_DIR, help="registry directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list versions (* marks the current one)")
+    use = sub.add_parser("use", help="make a version current (e.g. to roll back)")
+    use.add_argument("version")
+    imp = sub.add_parser("import", help="publish an existing pickled pipeline")
+    imp.add_argument("path")
+    imp.add_argument("--no-flat", action="store_true", help="skip the flat export")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    registry = ModelRegistry(args.root)
+    if args.command == "use":
+        registry.set_current(args.version)
+        print(f"Current version: {args.version}")
+    elif args.command == "import":
+        import joblib
+
+        model = joblib.load(args.path)
+        clf = model.named_steps.get("clf")
+        version = registry.publish(
+            model,
+            {"model": type(clf).__name__, "source": os.path.abspath(args.path)},
+            # Hashed features have no vocabulary for the flat engine
+            flat=flattenable(model) and not args.no_flat,
+        )
+        print(f"Published {args.path} as version {version}")
+    else:
+        _print_versions(registry)
@@ -0,0 +1,218 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src import instrument
+from src.forest_engine import load_model
+from src.inference import prepare_features, top_k_indices
+from src.model_registry import resolve_model_path
+from src.prediction_cache import default_model_path
+from src.symptom_matcher import SymptomMatcher
+
+CHUNK_SIZE = 20_000
+ID_COLUMNS = ["Patient_ID"]
+
+_worker_model = None
+_worker_matcher = None
+
+
+def canonicalize_symptoms(chunk, matcher):
+    """
+    Copy of chunk with each distinct Symptoms string mapped onto the
+    vocabulary by matcher. Every token maps to one term, so a derived
+    Symptom_Count is unchanged.
+    """
+    chunk = chunk.copy()
+    codes, texts = pd.factorize(chunk["Symptoms"].fillna("").astype(str))
+    canonical = np.array([matcher.canonicalize_text(t) for t in texts], dtype=object)
+    chunk["Symptoms"] = canonical[codes]
+    return chunk
+
+
+def score_chunk(model, chunk, top_k=3, matcher=None):
+    """
+    Return the top-k diseases and probabilities for every row of chunk,
+    with symptoms first mapped through matcher if given.
+    """
+    if matcher is not None:
+        with instrument.span("batch.match_symptoms"):
+            chunk = canonicalize_symptoms(chunk, matcher)
+    with instrument.span("predict_proba"):
+        proba = model.predict_proba(prepare_features(chunk))
+    classes = np.asarray(model.classes_)
+    top_idx = top_k_indices(proba, top_k)
+    top_proba = np.take_along_axis(proba, top_idx, axis=1)
+
+    out = pd.DataFrame(index=chunk.index)
+    for col in ID_COLUMNS:
+        if col in chunk.columns:
+            out[col] = chunk[col]
+    for rank in range(top_idx.shape[1]):
+        out[f"disease_{rank + 1}"] = classes[top_idx[:, rank]]
+        out[f"prob_{rank + 1}"] = top_proba[:, rank]
+    return out
+
+
+def _init_worker(model_path, fuzzy, instrument_config):
+    global _worker_model, _worker_matcher
+    instrument.init_worker(instrument_config)
+    _worker_model = load_model(model_path)
+    _worker_matcher = SymptomMatcher.for_model(_worker_model) if fuzzy else None
+
+
+def _score_in_worker(chunk, top_k):
+    result = score_chunk(_worker_model, chunk, top_k, _worker_matcher)
+    # Workers exit without running atexit, so write this worker's totals
+    # so far after every chunk
+    instrument.dump()
+    return result
+
+
+def _require_pyarrow():
+    """Raise ImportError with an install hint unless pyarrow is importable."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Writing Parquet requires pyarrow (pip install pyarrow).") from e
+
+
+class OutputWriter:
+    """Append scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.lower().endswith(".parquet")
+        self._writer = None
+        self._header = True
+        if self.parquet:
+            _require_pyarrow()
+        out_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(out_dir, exist_ok=True)
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._header else "a",
+                      header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run_batch(input_path, output_path, model_path=None,
+              chunksize=CHUNK_SIZE, workers=1, top_k=3, fuzzy=True):
+    """
+    Stream input_path through the saved pipeline in chunks and write the
+    top-k predictions to output_path. With workers > 1 chunks are scored
+    in separate processes, each loading the model once (a flat export is
+    memory-mapped, so they share one copy); at most two chunks per worker
+    are in flight, so memory stays bounded. A registry is resolved once,
+    so the whole run uses the version that was current when it started.
+    With fuzzy, misspelled and aliased symptoms are mapped onto the
+    model's vocabulary first (see src.symptom_matcher).
+    """
+    model_path = resolve_model_path(model_path or default_model_path())
+    start = time.perf_counter()
+    writer = OutputWriter(output_path)
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+    n_rows = 0
+
+    try:
+        if workers <= 1:
+            model = load_model(model_path)
+            matcher = SymptomMatcher.for_model(model) if fuzzy else None
+            for chunk in reader:
+                writer.write(score_chunk(model, chunk, top_k, matcher))
+                n_rows += len(chunk)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(model_path, fuzzy, instrument.worker_config()),
+            ) as pool:
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(_score_in_worker, chunk, top_k))
+                    if len(pending) >= 2 * workers:
+                        result = pending.popleft().result()
+                        writer.write(result)
+                        n_rows += len(result)
+                while pending:
+                    result = pending.popleft().result()
+                    writer.write(result)
+                    n_rows += len(result)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = n_rows / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {n_rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+    print(f"Predictions saved to: {output_path}")
+    return n_rows, elapsed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Score a CSV of patients with the saved disease model."
+    )
+    parser.add_argument("input", help="CSV with Age, Gender, Symptoms (and optionally Symptom_Count)")
+    parser.add_argument("output", help="output file, .csv or .parquet")
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="saved pipeline or flat export (default: the newer of the two in models/)",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"rows per chunk (default: {CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="scoring processes (default: 1, score in this process)",
+    )
+    parser.add_argument("--top-k", type=int, default=3, help="diseases per row (default: 3)")
+    parser.add_argument(
+        "--exact-symptoms",
+        action="store_true",
+        help="don't map misspelled or aliased symptoms onto the vocabulary",
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    if args.output.lower().endswith(".parquet"):
+        try:
+            _require_pyarrow()
+        except ImportError as e:
+            parser.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    instrument.configure(args)
+    run_batch(
+        args.input,
+        args.output,
+        model_path=args.model,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        top_k=args.top_k,
+        fuzzy=not args.exact_symptoms,
+    )
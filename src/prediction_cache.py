@@ -0,0 +1,303 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src import instrument
+from src.forest_engine import META_NAME, load_model
+from src.inference import build_input_frame, split_symptoms
+from src.model_registry import CURRENT_NAME, REGISTRY_DIR, ModelRegistry, is_registry
+from src.symptom_matcher import SymptomMatcher
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(BASE_DIR, "models", "disease_model.joblib")
+FLAT_MODEL_PATH = os.path.join(BASE_DIR, "models", "disease_model_flat")
+
+
+def _model_file(path):
+    # A flat export is a directory; its meta.json is rewritten on every export
+    return os.path.join(path, META_NAME) if os.path.isdir(path) else path
+
+
+def default_model_path():
+    """
+    The model registry once a version has been published to it (loaders
+    then follow its CURRENT pointer). Before that, the flat export when it
+    is at least as new as the pickled pipeline, since it is memory-mapped
+    instead of unpickled; otherwise the pickle. Tools given an explicit
+    --model path load that instead.
+    """
+    if is_registry(REGISTRY_DIR):
+        return REGISTRY_DIR
+    try:
+        flat = os.path.getmtime(_model_file(FLAT_MODEL_PATH))
+    except OSError:
+        return MODEL_PATH
+    try:
+        pickled = os.path.getmtime(MODEL_PATH)
+    except OSError:
+        return FLAT_MODEL_PATH
+    return FLAT_MODEL_PATH if flat >= pickled else MODEL_PATH
+
+
+def make_key(age, gender, symptoms, age_bucket=None):
+    """
+    Canonical cache key for one patient input. Symptoms may be a
+    comma-separated string or a list; they are stripped, lowercased and
+    sorted, so order and spacing don't matter (duplicates are kept because
+    they count towards Symptom_Count). With age_bucket, ages are floored
+    to the bucket width and nearby ages share a cached prediction.
+    """
+    if isinstance(symptoms, str):
+        symptoms = split_symptoms(symptoms)
+    tokens = tuple(sorted(s.strip().lower() for s in symptoms if str(s).strip()))
+    age = float(age)
+    if age_bucket:
+        age = float(np.floor(age / age_bucket) * age_bucket)
+    return age, str(gender).strip().title(), tokens
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with an optional time-to-live per entry."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        """
+        Store value; with generation (the invalidations count when it was
+        computed), skip it if the cache has been cleared since, so rows
+        from a model that was swapped out are never cached.
+        """
+        with self._lock:
+            if generation is not None and generation != self.invalidations:
+                return
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class CachedPredictor:
+    """
+    Wrap a saved model with a PredictionCache. model_path may be the
+    pickled pipeline, a flat export (see load_model) or a model registry,
+    in which case its CURRENT pointer is followed.
+
+    The model file's (or pointer's) mtime is checked at most every
+    check_interval seconds. When it changes, the new model is loaded on a
+    background thread while predictions keep using the old one, then
+    swapped in and the cache cleared. A model that fails to load (e.g. a
+    half-written file) is skipped and the old one kept.
+
+    With fuzzy=True (the default) symptoms are mapped onto the model's
+    vocabulary by its SymptomMatcher before keying and scoring, so
+    "Tiredness" and "fatige" are scored, and cached, as "fatigue".
+    """
+
+    def __init__(self, model_path=MODEL_PATH, maxsize=1024, ttl=None,
+                 age_bucket=None, check_interval=1.0, model=None, background=True,
+                 fuzzy=True):
+        self.model_path = model_path
+        self.age_bucket = age_bucket
+        self.check_interval = check_interval
+        self.background = background
+        self.fuzzy = fuzzy
+        self.matcher = None
+        self.cache = PredictionCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._signature = None
+        self._reloading = False
+        self._model = model
+        self.version = None
+        self.reload_error = None
+        if model is None:
+            self._signature = self._file_signature()
+            self._swap(*self._load())
+        else:
+            self._signature = self._file_signature()
+            self.matcher = self._make_matcher(model)
+
+    def _file_signature(self):
+        if is_registry(self.model_path):
+            path = os.path.join(self.model_path, CURRENT_NAME)
+        else:
+            path = _model_file(self.model_path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        # The inode catches files replaced with os.replace
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _load(self):
+        """(model, registry version or None) for what model_path points at."""
+        path, version = self.model_path, None
+        if is_registry(path):
+            registry = ModelRegistry(path)
+            version = registry.current()
+            path = registry.model_path(version)
+        with instrument.span("model.load"):
+            return load_model(path), version
+
+    def _make_matcher(self, model):
+        return SymptomMatcher.for_model(model) if self.fuzzy else None
+
+    def _swap(self, model, version, matcher=None):
+        if matcher is None:
+            matcher = self._make_matcher(model)
+        with self._lock:
+            self._model = model
+            self.matcher = matcher
+            self.version = version
+            self.cache.clear()
+
+    def _reload(self):
+        try:
+            model, version = self._load()
+            matcher = self._make_matcher(model)
+        except Exception as e:
+            self.reload_error = e
+            instrument.count("model.reload_errors")
+        else:
+            self._swap(model, version, matcher)
+            self.reload_error = None
+            instrument.count("model.reloads")
+        finally:
+            self._reloading = False
+
+    def _check_model(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            if self._reloading:
+                return
+            signature = self._file_signature()
+            if signature is None or signature == self._signature:
+                return
+            self._signature = signature
+            self._reloading = True
+        if self.background:
+            threading.Thread(target=self._reload, name="model-reload", daemon=True).start()
+        else:
+            self._reload()
+
+    def check_for_update(self):
+        """Poll for a new model now; with background=True this never blocks."""
+        self._check_model()
+
+    @property
+    def model(self):
+        self._check_model()
+        return self._model
+
+    def snapshot(self):
+        """
+        (model, matcher, cache generation), read together so a concurrent
+        swap can't pair one model with the other's vocabulary or cached
+        rows. Pass the generation to PredictionCache.put.
+        """
+        self._check_model()
+        with self._lock:
+            return self._model, self.matcher, self.cache.invalidations
+
+    def canonical_records(self, records, matcher):
+        """
+        records with each one's symptoms replaced by matcher's canonical
+        list (the matcher from the same snapshot() as the model); unchanged
+        when matcher is None.
+        """
+        if matcher is None:
+            return records
+        return [dict(r, symptoms=matcher.canonicalize(r["symptoms"])) for r in records]
+
+    def key(self, age, gender, symptoms):
+        return make_key(age, gender, symptoms, self.age_bucket)
+
+    def predict(self, age, gender, symptoms):
+        """(probabilities, classes) for one patient, from the cache when possible."""
+        results, classes = self.predict_many(
+            [{"age": age, "gender": gender, "symptoms": symptoms}]
+        )
+        return results[0], classes
+
+    def predict_many(self, records):
+        """
+        (list of probability rows, classes) for a list of {age, gender,
+        symptoms} dicts. Cache misses are scored together in a single
+        predict_proba call; classes come from the same model snapshot.
+        """
+        model, matcher, generation = self.snapshot()
+        records = self.canonical_records(records, matcher)
+        keys = [self.key(r["age"], r["gender"], r["symptoms"]) for r in records]
+        results = [self.cache.get(k) for k in keys]
+        if self.cache.invalidations != generation:
+            # Swapped meanwhile: the hits may be the new model's rows
+            results = [None] * len(records)
+        missing = [i for i, res in enumerate(results) if res is None]
+        instrument.count("predict.cache_hits", len(records) - len(missing))
+        instrument.count("predict.cache_misses", len(missing))
+        if missing:
+            with instrument.span("predict_proba"):
+                proba = model.predict_proba(build_input_frame([records[i] for i in missing]))
+            for i, row in zip(missing, proba):
+                row = row.copy()
+                row.setflags(write=False)
+                self.cache.put(keys[i], row, generation)
+                results[i] = row
+        return results, model.classes_
+
+    def stats(self):
+        return self.cache.stats()
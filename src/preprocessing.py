@@ -1,7 +1,12 @@
-from typing import List
+from functools import lru_cache
+from typing import Dict, List, Tuple
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils import murmurhash3_32
+
+from src import instrument
 
 
 class FullFeatureTransformer(BaseEstimator, TransformerMixin):
@@ -9,26 +14,121 @@ class FullFeatureTransformer(BaseEstimator, TransformerMixin):
     Transform the raw DataFrame with columns:
     Age, Gender, Symptom_Count, Symptoms
     into a single numeric feature matrix.
+
+    With sparse=True the matrix is returned as a float32 scipy CSR matrix
+    built with vectorized string operations instead of per-row loops.
+    The columns are the same as in the dense output.
+
+    The fitted vocabulary index is kept in symptom_index_, and raw symptom
+    strings are memoized to their column indices in a bounded LRU cache
+    (see symptom_indices and symptom_cache_info).
+
+    With fuzzy=True, tokens outside the vocabulary are mapped through
+    symptom_matcher() (aliases and misspellings, see src.symptom_matcher)
+    instead of being dropped.
     """
 
-    def __init__(self):
+    def __init__(self, sparse: bool = False, cache_size: int = 4096, fuzzy: bool = False):
+        self.sparse = sparse
+        self.cache_size = cache_size
+        self.fuzzy = fuzzy
         self.symptom_vocab_: List[str] = []
+        self.symptom_index_: Dict[str, int] = {}
         self.gender_to_idx_ = {}
+        self._symptom_cache = None
+        self._matcher = None
+
+    def __getstate__(self):
+        # The memo cache wraps a bound method; rebuild it after unpickling.
+        # The matcher index is rebuilt from the vocabulary on first use.
+        state = dict(super().__getstate__())
+        state["_symptom_cache"] = None
+        state["_matcher"] = None
+        return state
 
     def fit(self, X: pd.DataFrame, y=None):
+        self.symptom_vocab_ = []
+        self.gender_to_idx_ = {}
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X: pd.DataFrame, y=None):
+        """Extend the vocabulary and gender mapping with another chunk of rows."""
         # Build symptom vocabulary
-        symptom_set = set()
+        symptom_set = set(self.symptom_vocab_)
         for text in X["Symptoms"].fillna(""):
             parts = [s.strip().lower() for s in str(text).split(",") if s.strip()]
             symptom_set.update(parts)
         self.symptom_vocab_ = sorted(symptom_set)
+        self.symptom_index_ = {s: idx for idx, s in enumerate(self.symptom_vocab_)}
+        self._symptom_cache = None
+        self._matcher = None
 
         # Build gender mapping
-        genders = X["Gender"].fillna("Other").str.strip().str.title().unique()
+        genders = set(self.gender_to_idx_)
+        genders.update(X["Gender"].fillna("Other").str.strip().str.title().unique())
         self.gender_to_idx_ = {g: i for i, g in enumerate(sorted(genders))}
         return self
 
-    def transform(self, X: pd.DataFrame) -> np.ndarray:
+    def _get_symptom_index(self) -> Dict[str, int]:
+        # Models pickled before symptom_index_ existed only carry the vocab
+        index = getattr(self, "symptom_index_", None)
+        if not index and self.symptom_vocab_:
+            index = {s: idx for idx, s in enumerate(self.symptom_vocab_)}
+            self.symptom_index_ = index
+        return index or {}
+
+    def symptom_matcher(self):
+        """The fuzzy SymptomMatcher over the fitted vocabulary, built on first use."""
+        matcher = getattr(self, "_matcher", None)
+        if matcher is None:
+            from src.symptom_matcher import SymptomMatcher, load_aliases
+
+            matcher = SymptomMatcher(self.symptom_vocab_, load_aliases())
+            self._matcher = matcher
+        return matcher
+
+    def _column(self, token: str, index: Dict[str, int]):
+        """Column of one raw token, or None; misses go through the matcher with fuzzy."""
+        j = index.get(token.strip().lower())
+        if j is None and getattr(self, "fuzzy", False):
+            term = self.symptom_matcher().match(token)
+            if term is not None:
+                j = index.get(term)
+        return j
+
+    def _lookup_symptoms(self, text: str) -> Tuple[int, ...]:
+        index = self._get_symptom_index()
+        cols = set()
+        for part in text.split(","):
+            j = self._column(part, index)
+            if j is not None:
+                cols.add(j)
+        return tuple(sorted(cols))
+
+    def _get_symptom_cache(self):
+        cache = getattr(self, "_symptom_cache", None)
+        if cache is None:
+            maxsize = getattr(self, "cache_size", 4096)
+            cache = lru_cache(maxsize=maxsize)(self._lookup_symptoms)
+            self._symptom_cache = cache
+        return cache
+
+    def symptom_indices(self, text) -> Tuple[int, ...]:
+        """Return the symptom column indices for a raw "a, b, c" string."""
+        return self._get_symptom_cache()(str(text))
+
+    def symptom_cache_info(self):
+        """Hits, misses, maxsize and current size of the symptom memo cache."""
+        return self._get_symptom_cache().cache_info()
+
+    def transform(self, X: pd.DataFrame):
+        instrument.count("transform.rows", len(X))
+        with instrument.span("transform"):
+            if getattr(self, "sparse", False):
+                return self._transform_sparse(X)
+            return self._transform_dense(X)
+
+    def _transform_dense(self, X: pd.DataFrame) -> np.ndarray:
         X = X.copy()
 
         # Numeric features
@@ -48,14 +148,166 @@ class FullFeatureTransformer(BaseEstimator, TransformerMixin):
         # Symptom multi-hot
         n_symptoms = len(self.symptom_vocab_)
         symptom_mh = np.zeros((n_samples, n_symptoms), dtype=int)
-        vocab_index = {s: idx for idx, s in enumerate(self.symptom_vocab_)}
         for i, text in enumerate(X["Symptoms"].fillna("")):
-            parts = [s.strip().lower() for s in str(text).split(",") if s.strip()]
-            for s in parts:
-                j = vocab_index.get(s)
-                if j is not None:
-                    symptom_mh[i, j] = 1
+            cols = self.symptom_indices(text)
+            if cols:
+                symptom_mh[i, list(cols)] = 1
 
         # Concatenate: [age | symptom_count | gender_one_hot | symptom_multi_hot]
         features = np.hstack([age, sc, gender_oh, symptom_mh])
         return features
+
+    def _transform_sparse(self, X: pd.DataFrame) -> sp.csr_matrix:
+        n_samples = len(X)
+        n_genders = len(self.gender_to_idx_)
+        n_symptoms = len(self.symptom_vocab_)
+        rows = np.arange(n_samples)
+
+        # Numeric features (same median fill as the dense path)
+        age = X["Age"].fillna(X["Age"].median()).to_numpy(dtype=np.float32)
+        sc = X["Symptom_Count"].fillna(X["Symptom_Count"].median()).to_numpy(dtype=np.float32)
+        numeric = sp.csr_matrix(np.column_stack([age, sc]))
+
+        # Gender one-hot: one column per row, NaN for unseen genders
+        genders = X["Gender"].fillna("Other").str.strip().str.title()
+        gender_col = genders.map(self.gender_to_idx_).to_numpy(dtype=float)
+        known = ~np.isnan(gender_col)
+        gender_oh = sp.csr_matrix(
+            (np.ones(int(known.sum()), dtype=np.float32),
+             (rows[known], gender_col[known].astype(np.int64))),
+            shape=(n_samples, n_genders),
+        )
+
+        # Symptom multi-hot: tokenize each distinct symptom string once,
+        # normalize each distinct token once, then gather rows by code
+        vocab_index = self._get_symptom_index()
+        row_codes, texts = pd.factorize(X["Symptoms"].fillna("").astype(str))
+        tokens = pd.Series(texts, dtype=object).str.split(",").explode()
+        token_codes, token_uniques = pd.factorize(tokens)
+        token_cols = [self._column(str(t), vocab_index) for t in token_uniques]
+        token_cols = np.array(
+            [-1 if j is None else j for j in token_cols] + [-1],
+            dtype=np.int64,
+        )
+        cols = token_cols[token_codes]  # code -1 (missing) hits the trailing -1
+        hit = cols >= 0
+        text_mh = sp.csr_matrix(
+            (np.ones(int(hit.sum()), dtype=np.float32),
+             (tokens.index.to_numpy(dtype=np.int64)[hit], cols[hit])),
+            shape=(len(texts), n_symptoms),
+        )
+        text_mh.data[:] = 1  # repeated tokens in one string were summed
+        symptom_mh = text_mh[row_codes]
+
+        # Concatenate: [age | symptom_count | gender_one_hot | symptom_multi_hot]
+        features = sp.hstack([numeric, gender_oh, symptom_mh], format="csr", dtype=np.float32)
+        features.eliminate_zeros()
+        return features
+
+    def check_sparse_equivalence(self, X: pd.DataFrame) -> bool:
+        """Return True if the sparse and dense outputs agree on X."""
+        dense = self._transform_dense(X).astype(np.float32)
+        sparse = self._transform_sparse(X)
+        return dense.shape == sparse.shape and np.array_equal(dense, sparse.toarray())
+
+
+# Gender columns of HashingFeatureTransformer, fixed since it fits nothing;
+# any other value counts as "Other"
+HASHED_GENDERS: Tuple[str, ...] = ("Female", "Male", "Other")
+
+
+def _hash_token(token: str) -> int:
+    # murmurhash3 like HashingVectorizer: stable across runs and processes,
+    # unlike hash()
+    return murmurhash3_32(token, seed=0, positive=True)
+
+
+class HashingFeatureTransformer(BaseEstimator, TransformerMixin):
+    """
+    Stateless alternative to FullFeatureTransformer: symptom tokens are
+    hashed into a fixed number of columns instead of looked up in a
+    fitted vocabulary. There is nothing to fit, the width stays
+    n_features + 2 + len(HASHED_GENDERS) however many distinct (or
+    misspelled) symptoms the data has, and symptoms unseen in training get
+    a column instead of being dropped. Different tokens can share a
+    column; the gender is one-hot encoded in columns of its own.
+
+    With bigrams=True every pair of symptoms listed in the same row is
+    hashed as well (order-independent), so co-occurring symptoms get
+    their own feature.
+
+    Columns: [age | symptom_count | gender one-hot | hashed features],
+    float32 CSR by default or a dense array with sparse=False.
+    """
+
+    def __init__(self, n_features: int = 1024, bigrams: bool = False, sparse: bool = True):
+        self.n_features = n_features
+        self.bigrams = bigrams
+        self.sparse = sparse
+
+    def fit(self, X: pd.DataFrame, y=None):
+        return self
+
+    def partial_fit(self, X: pd.DataFrame, y=None):
+        return self
+
+    def transform(self, X: pd.DataFrame):
+        instrument.count("transform.rows", len(X))
+        with instrument.span("transform"):
+            features = self._transform(X)
+        return features if self.sparse else features.toarray()
+
+    def _transform(self, X: pd.DataFrame) -> sp.csr_matrix:
+        n_samples = len(X)
+        width = self.n_features
+        rows = np.arange(n_samples)
+
+        # Numeric features (same median fill as FullFeatureTransformer)
+        age = X["Age"].fillna(X["Age"].median()).to_numpy(dtype=np.float32)
+        sc = X["Symptom_Count"].fillna(X["Symptom_Count"].median()).to_numpy(dtype=np.float32)
+        numeric = sp.csr_matrix(np.column_stack([age, sc]))
+
+        # Gender one-hot over the fixed HASHED_GENDERS
+        genders = X["Gender"].fillna("Other").astype(str).str.strip().str.title()
+        gender_cols = pd.Categorical(genders, categories=HASHED_GENDERS).codes.astype(np.int64)
+        gender_cols[gender_cols < 0] = HASHED_GENDERS.index("Other")
+        gender = sp.csr_matrix(
+            (np.ones(n_samples, dtype=np.float32), (rows, gender_cols)),
+            shape=(n_samples, len(HASHED_GENDERS)),
+        )
+
+        # Symptoms: hash each distinct token of each distinct string once,
+        # then gather rows by code as in the sparse vocabulary path
+        row_codes, texts = pd.factorize(X["Symptoms"].fillna("").astype(str))
+        tokens = pd.Series(texts, dtype=object).str.split(",").explode()
+        token_codes, token_uniques = pd.factorize(tokens.str.strip().str.lower())
+        token_hash = np.array(
+            [_hash_token(str(t)) if t else -1 for t in token_uniques] + [-1],
+            dtype=np.int64,
+        )
+        pairs = pd.DataFrame({
+            "text": tokens.index.to_numpy(dtype=np.int64),
+            "hash": token_hash[token_codes],
+        })
+        pairs = pairs[pairs["hash"] >= 0].drop_duplicates()
+        text_ids, hashes = pairs["text"].to_numpy(), pairs["hash"].to_numpy()
+        if self.bigrams:
+            both = pairs.merge(pairs, on="text")
+            both = both[both["hash_x"] < both["hash_y"]]
+            # Combine the two 32-bit hashes and rehash
+            combined = (both["hash_x"].to_numpy() * 0x9E3779B1 + both["hash_y"].to_numpy()) & 0xFFFFFFFF
+            pair_hash = murmurhash3_32(combined.astype(np.uint32).view(np.int32), seed=1, positive=True)
+            text_ids = np.concatenate([text_ids, both["text"].to_numpy()])
+            hashes = np.concatenate([hashes, np.asarray(pair_hash, dtype=np.int64)])
+        text_mh = sp.csr_matrix(
+            (np.ones(len(hashes), dtype=np.float32), (text_ids, hashes % width)),
+            shape=(len(texts), width),
+        )
+
+        hashed = text_mh[row_codes]
+        hashed.data[:] = 1  # tokens sharing a column were summed
+
+        # Concatenate: [age | symptom_count | gender one-hot | hashed]
+        features = sp.hstack([numeric, gender, hashed], format="csr", dtype=np.float32)
+        features.eliminate_zeros()
+        return features
@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src import instrument
+from src.inference import build_input_frame, top_k_indices
+from src.prediction_cache import CachedPredictor, default_model_path
+
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+LATENCY_WINDOW = 10_000
+# Times a request is answered again when a model swap lands mid-request
+MAX_SWAP_RETRIES = 3
+
+
+class ServiceMetrics:
+    def __init__(self, max_batch_size):
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        # Power-of-two buckets up to the max batch size, then one overflow
+        # bucket so no batch is left out
+        self.batch_buckets = []
+        b = 1
+        while b < max_batch_size:
+            self.batch_buckets.append(b)
+            b *= 2
+        self.batch_buckets.append(max_batch_size)
+        self.batch_hist = {b: 0 for b in self.batch_buckets}
+        self.batch_overflow = 0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.rows += size
+        for b in self.batch_buckets:
+            if size <= b:
+                self.batch_hist[b] += 1
+                break
+        else:
+            self.batch_overflow += 1
+
+    def record_latency(self, seconds):
+        self.latencies_ms.append(seconds * 1000.0)
+
+    def snapshot(self, queue_depth):
+        if self.latencies_ms:
+            p50, p99 = np.percentile(np.fromiter(self.latencies_ms, dtype=float), [50, 99])
+        else:
+            p50 = p99 = 0.0
+        histogram = {f"<={b}": n for b, n in self.batch_hist.items()}
+        histogram[f">{self.batch_buckets[-1]}"] = self.batch_overflow
+        return {
+            "queue_depth": queue_depth,
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "errors": self.errors,
+            "batch_size_histogram": histogram,
+            "latency_ms": {"p50": round(float(p50), 3), "p99": round(float(p99), 3)},
+        }
+
+
+class MicroBatcher:
+    """
+    Group prediction requests that arrive within max_wait_ms of each other
+    into predict_proba calls of at most max_batch_size rows, run on a pool
+    of `threads` threads so the event loop stays responsive. Up to
+    `threads` batches are scored at once; while they all are busy, new
+    requests queue up and form the next batch. Requests larger than
+    max_batch_size are split across batches.
+
+    Each request names the model to score it with (predict_fn(model,
+    batch)), and a batch only holds requests for one model, so rows are
+    never scored by a model swapped in after the request took its
+    snapshot.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0, threads=1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.metrics = ServiceMetrics(max_batch_size)
+        self.queue = None
+        self._task = None
+        self._slots = None
+        self._scoring = set()
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.threads)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._scoring):
+            task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def predict(self, frame, model=None):
+        """Queue a DataFrame of inputs for model and wait for its probability rows."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for start in range(0, max(len(frame), 1), self.max_batch_size):
+            future = loop.create_future()
+            await self.queue.put((frame.iloc[start:start + self.max_batch_size], model, future))
+            futures.append(future)
+        parts = await asyncio.gather(*futures)
+        return parts[0] if len(parts) == 1 else np.vstack(parts)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        held = None  # an item that didn't fit in the previous batch
+        while True:
+            # Wait for a free thread first, so requests pile up meanwhile
+            await self._slots.acquire()
+            items = [held if held is not None else await self.queue.get()]
+            held = None
+            model = items[0][1]
+            n_rows = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while n_rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if n_rows + len(item[0]) > self.max_batch_size or item[1] is not model:
+                    held = item
+                    break
+                items.append(item)
+                n_rows += len(item[0])
+
+            task = asyncio.create_task(self._score(model, items))
+            self._scoring.add(task)
+            task.add_done_callback(self._scoring.discard)
+
+    async def _score(self, model, items):
+        loop = asyncio.get_running_loop()
+        try:
+            batch = pd.concat([frame for frame, _, _ in items], ignore_index=True)
+            self.metrics.record_batch(len(batch))
+            try:
+                proba = await loop.run_in_executor(self.executor, self.predict_fn, model, batch)
+            except Exception as e:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            offset = 0
+            for frame, _, future in items:
+                if not future.done():
+                    future.set_result(proba[offset:offset + len(frame)])
+                offset += len(frame)
+        finally:
+            self._slots.release()
+
+
+def format_predictions(proba, classes, top_k):
+    top_idx = top_k_indices(proba, top_k)
+    return [
+        [{"disease": str(classes[j]), "probability": float(row[j])} for j in idx]
+        for row, idx in zip(np.atleast_2d(proba), top_idx)
+    ]
+
+
+class PredictionServer:
+    def __init__(self, predictor, max_batch_size=64, max_wait_ms=5.0, threads=1):
+        self.predictor = predictor
+        self.batcher = MicroBatcher(self._predict_batch, max_batch_size, max_wait_ms, threads)
+
+    def _predict_batch(self, model, batch):
+        with instrument.span("predict_proba"):
+            return model.predict_proba(batch)
+
+    async def handle_predict(self, body):
+        payload = json.loads(body or b"{}")
+        top_k = int(payload.get("top_k", 3))
+        if "instances" in payload:
+            records, single = payload["instances"], False
+        else:
+            records, single = [payload], True
+        if not records:
+            return 200, {"results": []}
+
+        # Repeated inputs are answered from the prediction cache; only the
+        # misses go through the micro-batcher
+        cache = self.predictor.cache
+        raw_records = records
+        for attempt in range(MAX_SWAP_RETRIES):
+            model, matcher, generation = self.predictor.snapshot()
+            # Canonicalized with this model's own vocabulary
+            records = self.predictor.canonical_records(raw_records, matcher)
+            keys = [self.predictor.key(r["age"], r["gender"], r["symptoms"]) for r in records]
+            if attempt < MAX_SWAP_RETRIES - 1:
+                rows = [cache.get(k) for k in keys]
+            else:
+                # Still swapping: score everything with this snapshot's model
+                rows = [None] * len(records)
+            missing = [i for i, row in enumerate(rows) if row is None]
+            if missing:
+                frame = build_input_frame([records[i] for i in missing])
+                proba = await self.batcher.predict(frame, model)
+                for i, row in zip(missing, proba):
+                    row = row.copy()
+                    row.setflags(write=False)
+                    cache.put(keys[i], row, generation)
+                    rows[i] = row
+            # If the model was swapped mid-request the cache hits may be the
+            # new model's rows; answer again so they all match one set of
+            # classes (misses were scored by `model` either way)
+            if cache.invalidations == generation:
+                break
+
+        classes = np.asarray(model.classes_)
+        results = format_predictions(np.vstack(rows), classes, top_k)
+        if single:
+            return 200, {"predictions": results[0]}
+        return 200, {"results": [{"predictions": r} for r in results]}
+
+    async def dispatch(self, method, path, body):
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            start = time.perf_counter()
+            self.batcher.metrics.requests += 1
+            try:
+                status, payload = await self.handle_predict(body)
+            except (ValueError, KeyError, TypeError) as e:
+                self.batcher.metrics.errors += 1
+                return 400, {"error": f"bad request: {e}"}
+            self.batcher.metrics.record_latency(time.perf_counter() - start)
+            return status, payload
+        if path == "/metrics" and method == "GET":
+            snapshot = self.batcher.metrics.snapshot(self.batcher.queue.qsize())
+            snapshot["cache"] = self.predictor.stats()
+            return 200, snapshot
+        if path == "/health" and method == "GET":
+            return 200, {"status": "ok"}
+        return 404, {"error": "not found"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload = await self.dispatch(method, target.split("?")[0], body)
+                except Exception as e:
+                    self.batcher.metrics.errors += 1
+                    status, payload = 500, {"error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found",
+                   405: "Method Not Allowed", 413: "Payload Too Large",
+                   500: "Internal Server Error"}
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving predictions on http://{host}:{port} (POST /predict, GET /metrics)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the disease model over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="saved pipeline or flat export (default: the newer of the two in models/)",
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=64,
+        help="max rows per predict_proba call (default: 64)",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=5.0,
+        help="how long to wait for more requests to join a batch (default: 5)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="batches scored at once, each on its own thread (default: 1)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=4096,
+        help="cached predictions kept in memory (default: 4096)",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="seconds before a cached prediction expires (default: never)",
+    )
+    parser.add_argument(
+        "--exact-symptoms",
+        action="store_true",
+        help="don't map misspelled or aliased symptoms onto the vocabulary",
+    )
+    instrument.add_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    instrument.configure(args)
+    predictor = CachedPredictor(
+        args.model or default_model_path(),
+        maxsize=args.cache_size,
+        ttl=args.cache_ttl,
+        fuzzy=not args.exact_symptoms,
+    )
+    server = PredictionServer(
+        predictor,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        threads=args.threads,
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
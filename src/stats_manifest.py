@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(BASE_DIR, "data", "Healthcare.csv")
+STATS_PATH = os.path.join(BASE_DIR, "reports", "stats.json")
+
+
+def read_stats(path=STATS_PATH):
+    """
+    The stats manifest, e.g.
+
+        {"dataset": {"sha1", "total_patients", "n_diseases", "updated_at"},
+         "model": {"accuracy", "training_time_s", "dataset_sha1", ...}}
+
+    or {} if it hasn't been written yet.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_stats(section, values, path=STATS_PATH):
+    """Replace one section of the manifest, leaving the others as they are."""
+    stats = read_stats(path)
+    stats[section] = dict(values, updated_at=datetime.now().isoformat(timespec="seconds"))
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    # mkstemp creates it owner-only; other users' processes read it too
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+    return stats
+
+
+def dataset_stats(data_path=DATA_PATH):
+    # Imported here so reading the manifest (the GUI does it at startup)
+    # doesn't pull in numpy and pandas
+    from src.dataset import ensure_cache
+
+    # Read from the columnar cache metadata, not the CSV
+    meta = ensure_cache(data_path)
+    return {
+        "path": os.path.relpath(data_path, BASE_DIR),
+        "sha1": meta["sha1"],
+        "total_patients": meta["n_rows"],
+        "n_diseases": len(meta["diseases"]),
+    }
+
+
+def refresh_dataset_stats(data_path=DATA_PATH, path=STATS_PATH):
+    """Write the dataset section unless it already describes data_path."""
+    stats = read_stats(path)
+    current = dataset_stats(data_path)
+    previous = stats.get("dataset", {})
+    if all(previous.get(k) == v for k, v in current.items()):
+        return stats
+    return update_stats("dataset", current, path)
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
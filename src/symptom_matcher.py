@@ -0,0 +1,277 @@
+"""
+Fuzzy matching of free-text symptoms onto the model's vocabulary.
+
+A token that isn't exactly a vocabulary entry (after lowercasing) adds
+nothing to the feature vector, so "tiredness" or "wheezng" were silently
+ignored. SymptomMatcher maps each token to its best vocabulary entry:
+
+    1. exact match of the normalized token (case, punctuation, spacing)
+    2. the alias table, data/symptom_aliases.json ("tiredness" -> "fatigue")
+    3. a bounded edit distance (with adjacent transpositions) to a
+       vocabulary entry or alias, searched through a character trigram
+       inverted index so only terms sharing trigrams with the token are
+       compared
+
+Tokens with no match within the distance limit are left as they are, so
+Symptom_Count doesn't change. The index is built once per vocabulary;
+the transformer (fuzzy=True), CachedPredictor (the GUI and the server)
+and predict_batch share the one attached to a model via for_model().
+"""
+import json
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from src.inference import split_symptoms
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALIASES_PATH = os.path.join(BASE_DIR, "data", "symptom_aliases.json")
+
+# Edits allowed per this many characters of the token (so none below 4)
+CHARS_PER_EDIT = 4
+MAX_DISTANCE = 2
+# Index candidates verified with the edit distance, most shared trigrams first
+MAX_CANDIDATES = 32
+# Posting list entries counted per lookup once the pigeonhole minimum is met
+SEED_IDS = 8192
+
+_APOSTROPHES = re.compile(r"['’]")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_token(token) -> str:
+    """Lowercase, drop apostrophes, turn other punctuation into spaces and collapse them."""
+    token = _APOSTROPHES.sub("", str(token).lower())
+    return " ".join(_NON_WORD.split(token)).strip()
+
+
+def load_aliases(path=ALIASES_PATH):
+    """{alias: vocabulary term} from a JSON object; empty if the file is missing."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _trigrams(term):
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _pattern_masks(pattern):
+    """{character: bit mask of its positions in pattern}."""
+    masks = {}
+    for i, ch in enumerate(pattern):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks
+
+
+def _osa(masks, m, text):
+    """
+    Optimal string alignment distance between a pattern of length m (given
+    by its _pattern_masks) and text: Hyyro's bit-parallel algorithm, one
+    pass over text with a bit vector per column instead of a DP table.
+    Python ints act as infinite two's complement, so ~ needs no masking.
+    """
+    vp, vn, d0, previous = ~0, 0, 0, 0
+    dist = m
+    top = 1 << (m - 1)
+    for ch in text:
+        pm = masks.get(ch, 0)
+        swaps = ((~d0 & pm) << 1) & previous
+        d0 = (((pm & vp) + vp) ^ vp) | pm | vn | swaps
+        hp = vn | ~(d0 | vp)
+        hn = d0 & vp
+        if hp & top:
+            dist += 1
+        elif hn & top:
+            dist -= 1
+        hp = (hp << 1) | 1
+        vp = (hn << 1) | ~(d0 | hp)
+        vn = hp & d0
+        previous = pm
+    return dist
+
+
+def osa_distance(a, b):
+    """
+    Edits (insertions, deletions, substitutions and swaps of adjacent
+    characters) turning a into b, no substring edited twice.
+    """
+    if not a or not b:
+        return len(a) + len(b)
+    return _osa(_pattern_masks(a), len(a), b)
+
+
+class SymptomMatcher:
+    """
+    Map free-text symptom tokens onto a fixed vocabulary. Aliases whose
+    target isn't in the vocabulary are ignored. Results are memoized per
+    normalized token in a bounded LRU cache (cache_size=0 disables it).
+    """
+
+    def __init__(self, vocab, aliases=None, max_distance=MAX_DISTANCE,
+                 max_candidates=MAX_CANDIDATES, cache_size=4096):
+        self.vocab = list(vocab)
+        self.max_distance = max_distance
+        self.max_candidates = max_candidates
+        self.cache_size = cache_size
+        self._cache = None
+
+        # Every searchable spelling and the vocabulary term it stands for
+        targets = {}
+        for term in self.vocab:
+            targets.setdefault(normalize_token(term), term)
+        vocab_set = set(self.vocab)
+        for alias, term in (aliases or {}).items():
+            if term in vocab_set:
+                targets.setdefault(normalize_token(alias), term)
+        targets.pop("", None)
+        self._targets = targets
+
+        # Keys are numbered shortest first, so every posting list is sorted
+        # by key length too; with each list's offset per length, a query
+        # slices out just the keys whose length is within its limit
+        self._keys = sorted(targets, key=len)
+        self._key_grams = np.array([len(_trigrams(k)) for k in self._keys], dtype=np.int64)
+        lengths = np.array([len(k) for k in self._keys], dtype=np.int64)
+        self._max_length = int(lengths.max(initial=0))
+        bounds = np.arange(self._max_length + 2)
+        self._length_start = np.searchsorted(lengths, bounds).tolist()
+
+        postings = {}
+        for i, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(i)
+        self._postings = {}
+        for gram, ids in postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            self._postings[gram] = (ids, np.searchsorted(lengths[ids], bounds).tolist())
+
+    def __getstate__(self):
+        # The memo cache wraps a bound method; rebuild it after unpickling
+        state = dict(self.__dict__)
+        state["_cache"] = None
+        return state
+
+    def __len__(self):
+        return len(self._keys)
+
+    @classmethod
+    def for_model(cls, model):
+        """
+        The matcher for a loaded model's vocabulary: the fitted transformer's
+        own when it has one, else one built from a flat export's vocabulary.
+        None for models without a vocabulary (hashed features).
+        """
+        compiled = getattr(model, "compiled", None)
+        if compiled is not None:
+            return cls(compiled.symptom_vocab, load_aliases())
+        features = getattr(model, "named_steps", {}).get("features")
+        if hasattr(features, "symptom_matcher"):
+            return features.symptom_matcher()
+        return None
+
+    def _search(self, token):
+        limit = min(self.max_distance, len(token) // CHARS_PER_EDIT)
+        if limit == 0:
+            return None
+        lo = max(len(token) - limit, 0)
+        hi = min(len(token) + limit + 1, self._max_length + 1)
+        if lo >= hi:
+            return None
+        first, stop = self._length_start[lo], self._length_start[hi]
+        grams = _trigrams(token)
+        lists = []
+        for gram in grams:
+            entry = self._postings.get(gram)
+            if entry is not None:
+                ids, offsets = entry
+                if offsets[hi] > offsets[lo]:
+                    lists.append(ids[offsets[lo]:offsets[hi]])
+        # One edit changes at most 3 trigrams (4 for a swap), so a key
+        # within the limit lacks at most `budget` of the token's indexed
+        # trigrams: of any k posting lists it is in at least k - budget.
+        # Only the rarest lists are counted, past budget + 1 while they
+        # stay short; the rest just bound the count from above.
+        budget = 4 * limit - (len(grams) - len(lists))
+        if budget < 0:
+            return None
+        candidates, missing = [], []
+        if lists:
+            lists.sort(key=len)
+            k, volume = 0, 0
+            for ids in lists:
+                if k > budget and volume + len(ids) > SEED_IDS:
+                    break
+                k += 1
+                volume += len(ids)
+            shared = np.bincount(np.concatenate(lists[:k]) - first)
+            candidates = np.flatnonzero(shared >= max(k - budget, 1))
+            shared = shared[candidates]
+            missing = np.maximum(len(grams), self._key_grams[first + candidates])
+            missing -= shared + (len(lists) - k)
+            keep = missing <= 4 * limit
+            candidates, shared, missing = candidates[keep], shared[keep], missing[keep]
+            order = np.lexsort((-shared, missing))[:self.max_candidates]
+            candidates, missing = candidates[order].tolist(), missing[order].tolist()
+        if budget >= len(lists):
+            # Short tokens: a key within the limit may share none of the
+            # token's trigrams (a swap in a 4-letter word changes all of
+            # them), so the index rules nothing out. Verify the rest of the
+            # length slice after the ranked candidates.
+            seen = set(candidates)
+            rest = [i for i in range(stop - first) if i not in seen]
+            candidates, missing = candidates + rest, missing + [0] * len(rest)
+
+        masks = _pattern_masks(token)
+        best = None
+        for i, lacking in zip(candidates, missing):
+            if lacking > 4 * limit:
+                break
+            key = self._keys[first + i]
+            d = _osa(masks, len(token), key)
+            if d <= limit:
+                best, limit = key, d - 1
+                if limit < 1:
+                    break
+        return None if best is None else self._targets[best]
+
+    def _match(self, token):
+        if not token:
+            return None
+        term = self._targets.get(token)
+        return term if term is not None else self._search(token)
+
+    def _get_cache(self):
+        if self._cache is None:
+            self._cache = lru_cache(maxsize=self.cache_size)(self._match)
+        return self._cache
+
+    def match(self, token):
+        """The vocabulary term token stands for, or None."""
+        return self._get_cache()(normalize_token(token))
+
+    def resolve(self, symptoms):
+        """[(token, vocabulary term or None)] for a "a, b" string or a list."""
+        if isinstance(symptoms, str):
+            symptoms = split_symptoms(symptoms)
+        return [(s, self.match(s)) for s in symptoms if str(s).strip()]
+
+    def canonicalize(self, symptoms):
+        """
+        Symptoms as a list with every matched token replaced by its
+        vocabulary term; unmatched tokens are kept, stripped.
+        """
+        return [term or str(s).strip() for s, term in self.resolve(symptoms)]
+
+    def canonicalize_text(self, text):
+        """canonicalize() for a comma-separated string, joined back with ", "."""
+        return ", ".join(self.canonicalize(str(text)))
+
+    def cache_info(self):
+        return self._get_cache().cache_info()
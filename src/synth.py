@@ -0,0 +1,290 @@
+"""
+Synthetic patient data for scale and load testing.
+
+    python -m src.synth --rows 1000000 --output data/synthetic_1m.csv
+    python -m src.synth --rows 500000 --history data/synthetic_history.db
+
+PatientModel learns from data/Healthcare.csv:
+- the disease frequencies
+- gender and age (by year) given the disease
+- the number of symptoms given the disease
+- how often each symptom appears with each disease
+- how much more or less often each pair of symptoms appears together than
+  chance (their lift)
+
+Rows are sampled chunk by chunk from those tables, so memory stays constant
+however many rows are written, and a fixed seed always gives the same
+file.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import load_dataset
+from src.history_store import HISTORY_COLUMNS, HistoryStore
+from src.predict_batch import OutputWriter
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(BASE_DIR, "data", "Healthcare.csv")
+CHUNK_SIZE = 100_000
+
+
+def _split(text):
+    return [s for s in (p.strip().lower() for p in str(text).split(",")) if s]
+
+
+def _normalize_rows(table):
+    table = np.asarray(table, dtype=np.float64)
+    totals = table.sum(axis=1, keepdims=True)
+    return np.divide(table, totals, out=np.zeros_like(table), where=totals > 0)
+
+
+def _sample_rows(probs, rng):
+    """One index per row of probs (a row-stochastic matrix), vectorized."""
+    cdf = np.cumsum(probs, axis=1)
+    u = rng.random(len(probs))[:, None] * cdf[:, -1:]
+    return np.minimum((cdf < u).sum(axis=1), probs.shape[1] - 1)
+
+
+class PatientModel:
+    """Conditional frequency tables learned from a patient DataFrame."""
+
+    def __init__(self, diseases, genders, symptoms, disease_p, gender_p,
+                 ages, age_p, counts, count_p, symptom_p, lift):
+        self.diseases = np.asarray(diseases, dtype=object)
+        self.genders = np.asarray(genders, dtype=object)
+        self.symptoms = np.asarray(symptoms, dtype=object)
+        self.disease_p = disease_p      # (D,)
+        self.gender_p = gender_p        # (D, G)
+        self.ages = ages                # (A,)
+        self.age_p = age_p              # (D, A)
+        self.counts = counts            # (K,)
+        self.count_p = count_p          # (D, K)
+        self.symptom_p = symptom_p      # (D, S)
+        self.lift = lift                # (S, S)
+
+    @classmethod
+    def from_frame(cls, df):
+        df = df.dropna(subset=["Symptoms", "Disease"])
+        disease_codes, diseases = pd.factorize(df["Disease"], sort=True)
+        gender_codes, genders = pd.factorize(df["Gender"].fillna("Other"), sort=True)
+        age_values = df["Age"].fillna(df["Age"].median()).round().astype(int).to_numpy()
+        ages = np.unique(age_values)
+        n_d = len(diseases)
+
+        token_lists = [_split(t) for t in df["Symptoms"]]
+        symptoms = sorted({s for tokens in token_lists for s in tokens})
+        s_index = {s: i for i, s in enumerate(symptoms)}
+        n_s = len(symptoms)
+        counts = np.unique([len(t) for t in token_lists if t])
+
+        disease_p = np.bincount(disease_codes, minlength=n_d).astype(np.float64)
+        disease_p /= disease_p.sum()
+        gender_p = np.zeros((n_d, len(genders)))
+        np.add.at(gender_p, (disease_codes, gender_codes), 1)
+        age_p = np.zeros((n_d, len(ages)))
+        np.add.at(age_p, (disease_codes, np.searchsorted(ages, age_values)), 1)
+
+        count_p = np.zeros((n_d, len(counts)))
+        symptom_p = np.zeros((n_d, n_s))
+        pairs = np.zeros((n_s, n_s))
+        for d, tokens in zip(disease_codes, token_lists):
+            idx = sorted({s_index[s] for s in tokens})
+            if not idx:
+                continue
+            count_p[d, np.searchsorted(counts, len(tokens))] += 1
+            symptom_p[d, idx] += 1
+            pairs[np.ix_(idx, idx)] += 1
+
+        # Lift of each symptom pair: observed co-occurrence over what
+        # independent symptoms would give; 1 means no association
+        occurrence = np.diag(pairs).copy()
+        n_rows = max(len(token_lists), 1)
+        expected = np.outer(occurrence, occurrence) / n_rows
+        lift = np.divide(pairs, expected, out=np.ones_like(pairs), where=expected > 0)
+        np.fill_diagonal(lift, 1.0)
+
+        return cls(
+            diseases, genders, symptoms, disease_p,
+            _normalize_rows(gender_p), ages, _normalize_rows(age_p),
+            counts, _normalize_rows(count_p), _normalize_rows(symptom_p), lift,
+        )
+
+    @classmethod
+    def from_csv(cls, path=DATA_PATH):
+        return cls.from_frame(load_dataset(path))
+
+    def _sample_symptoms(self, disease, k, rng):
+        """
+        Draw k distinct symptoms per row without replacement. Each draw is
+        weighted by the symptom's frequency for the row's disease times its
+        mean lift with the symptoms already drawn.
+        """
+        n = len(disease)
+        base = self.symptom_p[disease]
+        chosen = np.full((n, k.max()), -1, dtype=np.int64)
+        lift_sum = np.zeros_like(base)
+        taken = np.zeros(base.shape, dtype=bool)
+        for step in range(k.max()):
+            active = k > step
+            weights = base if step == 0 else base * lift_sum / step
+            weights = np.where(taken, 0.0, weights)
+            # Fall back to uniform over what's left if the weights run out
+            empty = weights.sum(axis=1) <= 0
+            weights[empty] = ~taken[empty]
+            pick = _sample_rows(weights, rng)
+            rows = np.flatnonzero(active)
+            chosen[rows, step] = pick[rows]
+            taken[rows, pick[rows]] = True
+            lift_sum[rows] += self.lift[pick[rows]]
+        return chosen
+
+    def sample(self, n, rng, start_id=1):
+        """A DataFrame of n patients in the Healthcare.csv layout."""
+        disease = rng.choice(len(self.diseases), size=n, p=self.disease_p)
+        gender = _sample_rows(self.gender_p[disease], rng)
+        age = self.ages[_sample_rows(self.age_p[disease], rng)]
+        k = self.counts[_sample_rows(self.count_p[disease], rng)]
+        k = np.minimum(k, len(self.symptoms))
+        chosen = self._sample_symptoms(disease, k, rng)
+
+        names = self.symptoms
+        texts = [", ".join(names[row[:m]]) for row, m in zip(chosen, k)]
+        return pd.DataFrame({
+            "Patient_ID": np.arange(start_id, start_id + n),
+            "Age": age,
+            "Gender": self.genders[gender],
+            "Symptoms": texts,
+            "Symptom_Count": k,
+            "Disease": self.diseases[disease],
+        })
+
+    def iter_chunks(self, n_rows, seed=0, chunksize=CHUNK_SIZE):
+        rng = np.random.default_rng(seed)
+        for start in range(0, n_rows, chunksize):
+            yield self.sample(min(chunksize, n_rows - start), rng, start_id=start + 1)
+
+    def sample_history(self, n, rng, start, end):
+        """
+        n prediction_history records (HISTORY_COLUMNS) with timestamps
+        spread evenly at random between start and end, in time order.
+        The true disease is the top prediction about half of the time.
+        """
+        patients = self.sample(n, rng)
+        n_d = len(self.diseases)
+        true = pd.Index(self.diseases).get_indexer(patients["Disease"])
+        top = rng.choice(n_d, size=(n, 3), p=self.disease_p)
+        hit = rng.random(n) < 0.5
+        top[hit, 0] = true[hit]
+        # Make the three predictions distinct
+        top[:, 1] = np.where(top[:, 1] == top[:, 0], (top[:, 1] + 1) % n_d, top[:, 1])
+        clash = (top[:, 2] == top[:, 0]) | (top[:, 2] == top[:, 1])
+        while clash.any():
+            top[clash, 2] = (top[clash, 2] + 1) % n_d
+            clash = (top[:, 2] == top[:, 0]) | (top[:, 2] == top[:, 1])
+
+        probs = -np.sort(-rng.dirichlet(np.ones(n_d), size=n)[:, :3], axis=1)
+        span = (end - start).total_seconds()
+        offsets = np.sort(rng.random(n)) * span
+        timestamps = pd.Timestamp(start) + pd.to_timedelta(offsets, unit="s")
+
+        return pd.DataFrame({
+            "timestamp": timestamps.strftime("%Y-%m-%d %H:%M:%S"),
+            "age": patients["Age"].astype(float),
+            "gender": patients["Gender"],
+            "symptoms": patients["Symptoms"],
+            "symptom_count": patients["Symptom_Count"],
+            "predicted_disease": self.diseases[top[:, 0]],
+            "top1_prob": probs[:, 0].round(4),
+            "top2_disease": self.diseases[top[:, 1]],
+            "top2_prob": probs[:, 1].round(4),
+            "top3_disease": self.diseases[top[:, 2]],
+            "top3_prob": probs[:, 2].round(4),
+        })[HISTORY_COLUMNS]
+
+    def iter_history_chunks(self, n_rows, seed=0, days=90, chunksize=CHUNK_SIZE, end=None):
+        # Each chunk covers its own slice of the time range, so the
+        # timestamps keep increasing across chunks
+        rng = np.random.default_rng(seed)
+        end = end or datetime.now().replace(microsecond=0)
+        start = end - timedelta(days=days)
+        step = (end - start) / max(n_rows, 1)
+        for offset in range(0, n_rows, chunksize):
+            n = min(chunksize, n_rows - offset)
+            yield self.sample_history(n, rng, start + step * offset, start + step * (offset + n))
+
+
+def write_patients(path, n_rows, seed=0, chunksize=CHUNK_SIZE, model=None):
+    """Stream n_rows synthetic patients to a .csv or .parquet file."""
+    model = model or PatientModel.from_csv()
+    writer = OutputWriter(path)
+    try:
+        for chunk in model.iter_chunks(n_rows, seed, chunksize):
+            writer.write(chunk)
+    finally:
+        writer.close()
+
+
+def write_history(path, n_rows, seed=0, days=90, chunksize=CHUNK_SIZE, model=None):
+    """
+    Write n_rows synthetic prediction_history records, either to a SQLite
+    history store (.db) or to a .csv/.parquet file.
+    """
+    model = model or PatientModel.from_csv()
+    chunks = model.iter_history_chunks(n_rows, seed, days, chunksize)
+    if path.lower().endswith(".db"):
+        store = HistoryStore(path)
+        try:
+            for chunk in chunks:
+                store.append_many(chunk.to_dict("records"))
+        finally:
+            store.close()
+        return
+    writer = OutputWriter(path)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    finally:
+        writer.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic SymptoCare data.")
+    parser.add_argument("--rows", type=int, required=True, help="number of rows to generate")
+    parser.add_argument("--output", help="patients file (.csv or .parquet)")
+    parser.add_argument(
+        "--history",
+        help="prediction history to write instead: a .db store, or .csv/.parquet",
+    )
+    parser.add_argument("--days", type=int, default=90, help="history time span (default: 90)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"rows generated per chunk (default: {CHUNK_SIZE})",
+    )
+    parser.add_argument("--source", default=DATA_PATH, help="dataset to learn from")
+    args = parser.parse_args()
+    if not args.output and not args.history:
+        parser.error("give --output and/or --history")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    model = PatientModel.from_csv(args.source)
+    if args.output:
+        write_patients(args.output, args.rows, args.seed, args.chunksize, model)
+        print(f"Wrote {args.rows:,} patients to {args.output}")
+    if args.history:
+        write_history(args.history, args.rows, args.seed, args.days, args.chunksize, model)
+        print(f"Wrote {args.rows:,} history records to {args.history}")
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/sec)")
@@ -1,13 +1,23 @@
+import argparse
 import os
-import joblib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MaxAbsScaler
 
-from src.preprocessing import FullFeatureTransformer
+from src import instrument
+from src.dataset import load_dataset
+from src.forest_engine import CompiledModel
+from src.model_registry import ModelRegistry, link_file
+from src.preprocessing import FullFeatureTransformer, HashingFeatureTransformer
+from src.stats_manifest import refresh_dataset_stats, update_stats
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -17,6 +27,12 @@ REPORTS_DIR = os.path.join(BASE_DIR, "reports")
 EDA_PLOTS_DIR = os.path.join(REPORTS_DIR, "eda_plots")
 METRICS_PATH = os.path.join(REPORTS_DIR, "metrics.txt")
 MODEL_PATH = os.path.join(MODELS_DIR, "disease_model.joblib")
+FLAT_MODEL_PATH = os.path.join(MODELS_DIR, "disease_model_flat")
+
+FEATURE_COLUMNS = ["Age", "Gender", "Symptoms", "Symptom_Count"]
+CHUNK_SIZE = 50_000
+# Streaming mode holds out every HOLDOUT_EVERY-th CSV row for evaluation (20%)
+HOLDOUT_EVERY = 5
 
 
 def ensure_dirs():
@@ -26,23 +42,53 @@ def ensure_dirs():
 
 
 def load_data():
-    df = pd.read_csv(DATA_PATH)
+    # Parsed once into data/.cache and memory-mapped on later runs
+    return load_dataset(DATA_PATH)
+
+
+def iter_chunks(chunksize=CHUNK_SIZE):
+    reader = pd.read_csv(
+        DATA_PATH,
+        usecols=FEATURE_COLUMNS + ["Disease"],
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        # The reader keeps a running index, so chunk.index is the CSV row number
+        yield chunk.dropna(subset=["Symptoms", "Disease"])
 
-    df = df[["Age", "Gender", "Symptoms", "Symptom_Count", "Disease"]]
 
-    df = df.dropna(subset=["Symptoms", "Disease"])
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
-    df = df.reset_index(drop=True)
-    return df
 
+def resolve_n_jobs(n_jobs):
+    # Same convention as scikit-learn: None means 1, -1 means all cores
+    cpus = os.cpu_count() or 1
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpus + 1 + n_jobs)
+    return max(1, n_jobs)
 
-def build_pipeline():
-    feature_transformer = FullFeatureTransformer()
+
+def build_pipeline(sparse=False, n_jobs=None, hash_features=None, hash_bigrams=False):
+    # hash_features=N swaps the fitted symptom vocabulary for N hashed columns
+    if hash_features:
+        feature_transformer = HashingFeatureTransformer(hash_features, hash_bigrams, sparse=sparse)
+    else:
+        feature_transformer = FullFeatureTransformer(sparse=sparse)
 
     clf = RandomForestClassifier(
         n_estimators=200,
         random_state=42,
-        class_weight="balanced"
+        class_weight="balanced",
+        n_jobs=n_jobs
     )
 
     model = Pipeline(steps=[
@@ -53,9 +99,66 @@ def build_pipeline():
     return model
 
 
-def train_and_evaluate():
+def _run_fold(X_train, y_train, X_test, y_test, sparse, n_jobs, hash_features, hash_bigrams):
+    # Each fold transforms its train/test rows once and reuses the matrices
+    # for fitting and scoring instead of going through Pipeline twice.
+    model = build_pipeline(sparse, n_jobs, hash_features, hash_bigrams)
+    features = model.named_steps["features"]
+    clf = model.named_steps["clf"]
+
+    start = time.perf_counter()
+    Xt_train = features.fit_transform(X_train)
+    Xt_test = features.transform(X_test)
+    clf.fit(Xt_train, y_train)
+    acc = accuracy_score(y_test, clf.predict(Xt_test))
+    return acc, time.perf_counter() - start
+
+
+def cross_validate(X, y, folds=5, sparse=False, n_jobs=None,
+                   hash_features=None, hash_bigrams=False):
+    """Stratified k-fold accuracy, with folds running in parallel processes."""
+    total_jobs = resolve_n_jobs(n_jobs)
+    workers = min(folds, total_jobs)
+    # Split the cores between folds so the forests don't oversubscribe them
+    jobs_per_fold = max(1, total_jobs // workers)
+
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _run_fold,
+                X.iloc[train_idx], y.iloc[train_idx],
+                X.iloc[test_idx], y.iloc[test_idx],
+                sparse, jobs_per_fold, hash_features, hash_bigrams,
+            )
+            for train_idx, test_idx in splitter.split(X, y)
+        ]
+        results = [f.result() for f in futures]
+
+    scores = np.array([acc for acc, _ in results])
+    fold_times = [t for _, t in results]
+    return scores, fold_times
+
+
+def export_flat_model(model, path=FLAT_MODEL_PATH, **options):
+    """
+    Flatten the fitted forest into NumPy arrays for src.forest_engine.
+    options (compact, value_dtype, max_depth, min_samples_leaf) go to
+    CompiledModel.from_pipeline; without them the export is exact.
+    """
+    compiled = CompiledModel.from_pipeline(model, **options)
+    compiled.save(path)
+    return compiled
+
+
+def train_and_evaluate(sparse=False, n_jobs=None, cv_folds=0,
+                       hash_features=None, hash_bigrams=False):
     ensure_dirs()
+    timings = {}
+
+    start = time.perf_counter()
     df = load_data()
+    timings["load"] = time.perf_counter() - start
 
     X = df[["Age", "Gender", "Symptoms", "Symptom_Count"]]
     y = df["Disease"]
@@ -64,30 +167,282 @@ def train_and_evaluate():
         X, y, test_size=0.2, stratify=y, random_state=42
     )
 
-    model = build_pipeline()
+    model = build_pipeline(sparse, n_jobs, hash_features, hash_bigrams)
+    features = model.named_steps["features"]
+    clf = model.named_steps["clf"]
+
+    print("Transforming features...")
+    start = time.perf_counter()
+    Xt_train = features.fit_transform(X_train)
+    Xt_test = features.transform(X_test)
+    timings["transform"] = time.perf_counter() - start
 
-    print("Fitting model...")
-    model.fit(X_train, y_train)
+    if sparse and not hash_features:
+        # Guard the sparse path against drifting from the dense one
+        if not features.check_sparse_equivalence(X_train.head(1000)):
+            raise ValueError("Sparse feature matrix does not match the dense one.")
+
+    print(f"Fitting model (n_jobs={resolve_n_jobs(n_jobs)})...")
+    start = time.perf_counter()
+    clf.fit(Xt_train, y_train)
+    timings["fit"] = time.perf_counter() - start
 
     print("Evaluating...")
-    y_pred = model.predict(X_test)
+    start = time.perf_counter()
+    y_pred = clf.predict(Xt_test)
     acc = accuracy_score(y_test, y_pred)
     cm = confusion_matrix(y_test, y_pred)
     report = classification_report(y_test, y_pred)
+    timings["evaluate"] = time.perf_counter() - start
 
     print(f"Accuracy: {acc:.4f}")
     print(report)
 
+    cv_scores = None
+    if cv_folds and cv_folds > 1:
+        print(f"Cross-validating ({cv_folds} folds)...")
+        start = time.perf_counter()
+        cv_scores, fold_times = cross_validate(
+            X, y, cv_folds, sparse, n_jobs, hash_features, hash_bigrams
+        )
+        timings["cross_validate"] = time.perf_counter() - start
+        print(f"CV accuracy: {cv_scores.mean():.4f} +/- {cv_scores.std():.4f}")
+
+    def write_metrics():
+        with open(METRICS_PATH, "w") as f:
+            f.write(f"Accuracy: {acc:.4f}\n\n")
+            if cv_scores is not None:
+                f.write(f"Cross-validation ({cv_folds} folds): ")
+                f.write(f"{cv_scores.mean():.4f} +/- {cv_scores.std():.4f}\n")
+                for i, (score, seconds) in enumerate(zip(cv_scores, fold_times), start=1):
+                    f.write(f"  fold {i}: {score:.4f} ({seconds:.2f}s)\n")
+                f.write("\n")
+            f.write(f"Stage timings (s, n_jobs={resolve_n_jobs(n_jobs)}):\n")
+            for stage, seconds in timings.items():
+                f.write(f"  {stage}: {seconds:.3f}\n")
+            f.write("\nClassification report:\n")
+            f.write(report)
+            f.write("\nConfusion matrix:\n")
+            f.write(np.array2string(cm))
+
+    # Written before publishing so the version gets a copy, and again
+    # with the dump stage (pickle, flat export, CURRENT) once it's timed
+    write_metrics()
+    start = time.perf_counter()
+    with instrument.span("train.publish"):
+        version = publish_model(
+            model,
+            # The flat engine needs the vocabulary layout
+            flat=not hash_features,
+            model="random_forest",
+            features=feature_mode(hash_features, hash_bigrams),
+            accuracy=acc,
+            training_time_s=timings["fit"],
+            total_time_s=sum(timings.values()),
+            n_train=len(X_train),
+        )
+    timings["dump"] = time.perf_counter() - start
+    write_metrics()
+    ModelRegistry().save_metrics(version, METRICS_PATH)
+
+    for stage, seconds in timings.items():
+        instrument.record(f"train.{stage}", seconds)
+
+
+def feature_mode(hash_features=None, hash_bigrams=False):
+    if not hash_features:
+        return "vocabulary"
+    return f"hashing({hash_features}{', bigrams' if hash_bigrams else ''})"
+
+
+def publish_model(pipeline, flat=False, **values):
+    """
+    Publish the pipeline as a new registry version with its metrics and the
+    hash of the dataset it was trained on, and make it current (running
+    apps pick it up from there). MODEL_PATH is relinked to the same pickle
+    for tools that read it directly. Then record the run in the stats
+    manifest read by the dashboard. flat=True adds the flat forest export.
+    """
+    start = time.perf_counter()
+    stats = refresh_dataset_stats(DATA_PATH)
+    values["accuracy"] = round(float(values["accuracy"]), 6)
+    values["dataset_sha1"] = stats["dataset"]["sha1"]
+
+    registry = ModelRegistry()
+    version = registry.publish(pipeline, values, flat=flat, metrics_path=METRICS_PATH)
+    link_file(registry.pickle_path(version), MODEL_PATH)
+    print(f"Model published as version {version} ({time.perf_counter() - start:.1f}s): "
+          f"{registry.version_dir(version)}")
+
+    values["version"] = version
+    update_stats("model", values)
+    return version
+
+
+def train_streaming(chunksize=CHUNK_SIZE, epochs=1, hash_features=None, hash_bigrams=False):
+    """
+    Out-of-core training: the CSV is read in chunks, so peak memory is
+    bounded by the chunk size rather than the dataset size.
+
+    Pass 1 fits the symptom vocabulary, gender mapping and class labels,
+    pass 2 fits the feature scaler, and each further pass feeds the
+    training rows to SGDClassifier.partial_fit. A final pass evaluates
+    on the held-out rows.
+    """
+    ensure_dirs()
+    start = time.perf_counter()
+    rows_read = 0
+
+    if hash_features:
+        # Nothing to fit, so pass 1 only collects the labels
+        features = HashingFeatureTransformer(hash_features, hash_bigrams)
+    else:
+        features = FullFeatureTransformer(sparse=True)
+    scaler = MaxAbsScaler()
+    clf = SGDClassifier(loss="log_loss", random_state=42)
+
+    print("Pass 1: fitting vocabulary..." if not hash_features else "Pass 1: collecting labels...")
+    labels = set()
+    for chunk in iter_chunks(chunksize):
+        features.partial_fit(chunk[FEATURE_COLUMNS])
+        labels.update(chunk["Disease"].unique())
+        rows_read += len(chunk)
+    classes = np.array(sorted(labels))
+
+    print("Pass 2: fitting feature scaling...")
+    for chunk in iter_chunks(chunksize):
+        train = chunk[chunk.index % HOLDOUT_EVERY != 0]
+        # A chunk smaller than HOLDOUT_EVERY can be all holdout rows
+        if not train.empty:
+            scaler.partial_fit(features.transform(train[FEATURE_COLUMNS]))
+        rows_read += len(chunk)
+
+    for epoch in range(epochs):
+        print(f"Pass {epoch + 3}: training (epoch {epoch + 1}/{epochs})...")
+        for chunk in iter_chunks(chunksize):
+            train = chunk[chunk.index % HOLDOUT_EVERY != 0]
+            if not train.empty:
+                Xt = scaler.transform(features.transform(train[FEATURE_COLUMNS]))
+                with instrument.span("train.partial_fit"):
+                    clf.partial_fit(Xt, train["Disease"], classes=classes)
+            rows_read += len(chunk)
+
+    model = Pipeline(steps=[
+        ("features", features),
+        ("scale", scaler),
+        ("clf", clf)
+    ])
+
+    print("Evaluating...")
+    cm = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    for chunk in iter_chunks(chunksize):
+        test = chunk[chunk.index % HOLDOUT_EVERY == 0]
+        if not test.empty:
+            y_pred = model.predict(test[FEATURE_COLUMNS])
+            cm += confusion_matrix(test["Disease"], y_pred, labels=classes)
+        rows_read += len(chunk)
+    acc = np.trace(cm) / max(cm.sum(), 1)
+
+    elapsed = time.perf_counter() - start
+    rows_per_sec = rows_read / elapsed if elapsed > 0 else 0.0
+    peak = peak_rss_mb()
+    peak_text = f"{peak:.1f} MB" if peak is not None else "n/a"
+
+    print(f"Accuracy: {acc:.4f}")
+    print(f"Processed {rows_read} rows in {elapsed:.1f}s ({rows_per_sec:,.0f} rows/sec)")
+    print(f"Peak RSS: {peak_text}")
+
     with open(METRICS_PATH, "w") as f:
         f.write(f"Accuracy: {acc:.4f}\n\n")
-        f.write("Classification report:\n")
-        f.write(report)
-        f.write("\nConfusion matrix:\n")
+        f.write("Streaming training (SGDClassifier, log loss):\n")
+        f.write(f"Chunk size: {chunksize}\n")
+        f.write(f"Epochs: {epochs}\n")
+        f.write(f"Rows processed: {rows_read}\n")
+        f.write(f"Rows/sec: {rows_per_sec:.0f}\n")
+        f.write(f"Peak RSS: {peak_text}\n")
+        f.write("\nClasses:\n")
+        f.write(", ".join(classes))
+        f.write("\n\nConfusion matrix:\n")
         f.write(np.array2string(cm))
 
-    joblib.dump(model, MODEL_PATH)
-    print(f"Model saved to: {MODEL_PATH}")
+    publish_model(
+        model,
+        model="streaming_sgd",
+        features=feature_mode(hash_features, hash_bigrams),
+        accuracy=acc,
+        training_time_s=elapsed,
+        total_time_s=time.perf_counter() - start,
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the SymptoCare disease model.")
+    parser.add_argument(
+        "--sparse",
+        action="store_true",
+        help="build the feature matrix as a sparse float32 CSR matrix",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=None,
+        help="cores for training and cross-validation, -1 for all (default: 1)",
+    )
+    parser.add_argument(
+        "--cv",
+        type=int,
+        default=0,
+        metavar="K",
+        help="also run K-fold cross-validation with folds in parallel processes",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="train out-of-core on CSV chunks with an incremental SGD model",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"rows per chunk in --stream mode (default: {CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--epochs",
+        type=int,
+        default=1,
+        help="training passes over the CSV in --stream mode (default: 1)",
+    )
+    parser.add_argument(
+        "--hash-features",
+        type=int,
+        default=None,
+        metavar="N",
+        help="hash symptoms into N fixed columns instead of fitting a vocabulary",
+    )
+    parser.add_argument(
+        "--hash-bigrams",
+        action="store_true",
+        help="with --hash-features, also hash each pair of symptoms in a row",
+    )
+    instrument.add_arguments(parser)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    train_and_evaluate()
+    args = parse_args()
+    instrument.configure(args)
+    if args.stream:
+        train_streaming(
+            chunksize=args.chunksize,
+            epochs=args.epochs,
+            hash_features=args.hash_features,
+            hash_bigrams=args.hash_bigrams,
+        )
+    else:
+        train_and_evaluate(
+            sparse=args.sparse,
+            n_jobs=args.n_jobs,
+            cv_folds=args.cv,
+            hash_features=args.hash_features,
+            hash_bigrams=args.hash_bigrams,
+        )
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+from src.preprocessing import FullFeatureTransformer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(BASE_DIR, "data", "Healthcare.csv")
+FEATURE_COLUMNS = ["Age", "Gender", "Symptoms", "Symptom_Count"]
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+
+
+def assert_equivalent(transformer, X):
+    dense = transformer._transform_dense(X)
+    sparse = transformer._transform_sparse(X)
+    assert sp.isspmatrix_csr(sparse)
+    assert sparse.dtype == np.float32
+    assert dense.shape == sparse.shape
+    np.testing.assert_array_equal(dense.astype(np.float32), sparse.toarray())
+    assert transformer.check_sparse_equivalence(X)
+
+
+@pytest.fixture(scope="module")
+def real_rows():
+    df = pd.read_csv(DATA_PATH, usecols=FEATURE_COLUMNS, nrows=2000)
+    return df
+
+
+def test_real_rows(real_rows):
+    train, test = real_rows.iloc[:1500], real_rows.iloc[1500:]
+    transformer = FullFeatureTransformer().fit(train)
+    assert_equivalent(transformer, train)
+    assert_equivalent(transformer, test)
+
+
+def test_sparse_flag_selects_output(real_rows):
+    transformer = FullFeatureTransformer(sparse=True).fit(real_rows)
+    assert sp.issparse(transformer.transform(real_rows))
+    transformer.sparse = False
+    assert isinstance(transformer.transform(real_rows), np.ndarray)
+
+
+@pytest.fixture
+def fitted():
+    train = frame([
+        [30, "Male", "fever, cough", 2],
+        [45, "Female", "headache", 1],
+        [60, "Other", "cough, fatigue, headache", 3],
+    ])
+    return FullFeatureTransformer().fit(train)
+
+
+def test_missing_symptoms_and_age(fitted):
+    X = frame([
+        [np.nan, "Male", np.nan, np.nan],
+        [50, "Female", "fever", 1],
+        [np.nan, "Other", "", 0],
+    ])
+    assert_equivalent(fitted, X)
+    dense = fitted._transform_dense(X)
+    # Median fill of the rows present
+    assert dense[0, 0] == 50
+    assert dense[0, 2:].tolist().count(1) == 1  # only the gender column
+
+
+def test_duplicate_and_messy_tokens(fitted):
+    X = frame([
+        [30, "Male", "fever, fever, Fever ", 3],
+        [40, "female", " cough,,headache ,cough", 3],
+    ])
+    assert_equivalent(fitted, X)
+    dense = fitted._transform_dense(X)
+    assert set(np.unique(dense[:, 2:])) <= {0, 1}
+
+
+def test_unseen_gender_and_symptoms(fitted):
+    X = frame([
+        [30, "Nonbinary", "fever", 1],
+        [35, "Male", "rash, cough", 2],
+    ])
+    assert_equivalent(fitted, X)
+    n_genders = len(fitted.gender_to_idx_)
+    # Unseen gender: all gender columns zero; unseen symptom: dropped
+    assert fitted._transform_dense(X)[0, 2:2 + n_genders].sum() == 0
+    assert fitted._transform_dense(X)[1, 2 + n_genders:].sum() == 1
+
+
+def test_empty_frame(fitted):
+    assert_equivalent(fitted, frame([]))
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from src.symptom_matcher import (
+    CHARS_PER_EDIT,
+    MAX_DISTANCE,
+    SymptomMatcher,
+    normalize_token,
+    osa_distance,
+)
+
+VOCAB = ["fever", "cough", "headache", "sore throat", "shortness of breath",
+         "fatigue", "joint pain", "runny nose", "tsvw", "rash"]
+
+
+def brute_force_distance(matcher, token):
+    """Distance to the nearest searchable key, or None beyond the limit."""
+    limit = min(matcher.max_distance, len(token) // CHARS_PER_EDIT)
+    best = min(osa_distance(token, key) for key in matcher._targets)
+    return best if best <= limit else None
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("fever", "fever", 0),
+    ("fevr", "fever", 1),
+    ("tvsw", "tsvw", 1),
+    ("headahce", "headache", 1),
+    ("", "abc", 3),
+    ("ca", "abc", 3),
+])
+def test_osa_distance(a, b, expected):
+    assert osa_distance(a, b) == expected
+
+
+def test_exact_and_alias():
+    matcher = SymptomMatcher(VOCAB, {"tiredness": "fatigue", "itch": "not in vocab"})
+    assert matcher.match(" Fever ") == "fever"
+    assert matcher.match("Tiredness") == "fatigue"
+    assert matcher.match("itch") is None
+
+
+def test_swap_sharing_no_trigrams():
+    # Every padded trigram of "tvsw" ($tv, tvs, vsw, sw$) differs from
+    # those of "tsvw", yet one adjacent swap turns one into the other
+    matcher = SymptomMatcher(VOCAB, cache_size=0)
+    assert matcher.match("tvsw") == "tsvw"
+    assert matcher.match("rsah") == "rash"
+
+
+def test_short_tokens_need_exact_match():
+    matcher = SymptomMatcher(["flu", "rash"], cache_size=0)
+    assert matcher.match("flo") is None
+    assert matcher.match("flu") == "flu"
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(0)
+    letters = list("abcdefghijklmnopqrstuvwxyz")
+    vocab = sorted({"".join(rng.choice(letters, size=rng.integers(3, 11))) for _ in range(400)})
+    matcher = SymptomMatcher(vocab, cache_size=0, max_candidates=10**6)
+
+    for _ in range(2000):
+        token = list(vocab[rng.integers(len(vocab))])
+        for _ in range(rng.integers(1, MAX_DISTANCE + 1)):
+            i = int(rng.integers(len(token)))
+            kind = rng.integers(4)
+            if kind == 0 and len(token) > 1:
+                del token[i]
+            elif kind == 1:
+                token.insert(i, rng.choice(letters))
+            elif kind == 2:
+                token[i] = rng.choice(letters)
+            elif i + 1 < len(token):
+                token[i], token[i + 1] = token[i + 1], token[i]
+        token = normalize_token("".join(token))
+        if not token:
+            continue
+        expected = brute_force_distance(matcher, token)
+        got = matcher.match(token)
+        if expected is None:
+            assert got is None, token
+        else:
+            assert got is not None, token
+            assert osa_distance(token, got) == expected, token